@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+Benchmark the stages of the laser cut export pipeline on synthetic flat
+meshes, without running blender.
+"""
+
+# ------------------------------------------------------------------------------
+# Libraries
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import lasercut_svg_export as lc
+
+
+# ------------------------------------------------------------------------------
+# Author information
+__author__ = "Maarten Tegelaers"
+__copyright__ = "Copyright 2018, Maarten Tegelaers"
+
+__license__ = "All Rights Reserved"
+__version__ = "0.1"
+__status__ = "development"
+
+
+# ------------------------------------------------------------------------------
+# Synthetic meshes
+# All generators return (coordinates, face_vertices, face_sizes) of a flat
+# mesh in the xy plane with approximately n_edges boundary edges, like the
+# mesh readers of lasercut_cli.
+def _ring_mesh(outer: np.ndarray, inner: np.ndarray) -> tuple:
+    """
+    Build the quads between two closed rings with the same number of points.
+
+    :param outer: The (K, 2) points of the outer ring.
+    :param inner: The (K, 2) points of the inner ring.
+
+    :returns: (coordinates, face_vertices, face_sizes)
+    """
+    n_points = len(outer)
+    coordinates = np.zeros((2 * n_points, 3))
+    coordinates[:n_points, :2] = outer
+    coordinates[n_points:, :2] = inner
+
+    k = np.arange(n_points)
+    following = (k + 1) % n_points
+    face_vertices = np.stack((k, following, following + n_points, k + n_points), axis=1)
+    return coordinates, face_vertices.ravel(), np.full(n_points, 4)
+
+
+def _fan_mesh(outline: np.ndarray) -> tuple:
+    """
+    Build the triangle fan of a star shaped closed outline around its centre.
+
+    :param outline: The (K, 2) points of the outline.
+
+    :returns: (coordinates, face_vertices, face_sizes)
+    """
+    n_points = len(outline)
+    coordinates = np.zeros((n_points + 1, 3))
+    coordinates[:n_points, :2] = outline
+    coordinates[n_points, :2] = outline.mean(axis=0)
+
+    k = np.arange(n_points)
+    face_vertices = np.stack((k, (k + 1) % n_points, np.full(n_points, n_points)), axis=1)
+    return coordinates, face_vertices.ravel(), np.full(n_points, 3)
+
+
+def _merge_meshes(meshes: list) -> tuple:
+    """
+    Merge the specified meshes into a single mesh, offsetting the vertex
+    indices of each mesh.
+    """
+    offsets = np.cumsum([0] + [len(coordinates) for coordinates, _, _ in meshes])
+    return (np.concatenate([coordinates for coordinates, _, _ in meshes]),
+            np.concatenate([face_vertices + offset for (_, face_vertices, _), offset in zip(meshes, offsets)]),
+            np.concatenate([face_sizes for _, _, face_sizes in meshes]))
+
+
+def _circle(center: tuple, radius: float, n_points: int) -> np.ndarray:
+    angles = np.linspace(0.0, 2.0 * math.pi, n_points, endpoint=False)
+    return np.stack((center[0] + radius * np.cos(angles), center[1] + radius * np.sin(angles)), axis=1)
+
+
+def make_gear(n_edges: int) -> tuple:
+    """
+    Make a gear with an axle hole, of which the teeth carry half of the
+    boundary edges and the hole the other half.
+    """
+    n_points = max(n_edges // 2, 16)
+    n_teeth = max(n_points // 32, 8)
+
+    angles = np.linspace(0.0, 2.0 * math.pi, n_points, endpoint=False)
+    # trapezoidal teeth, clipped from a triangle wave
+    wave = np.abs(((angles * n_teeth / math.pi) % 2.0) - 1.0)
+    radii = 10.0 + np.clip(3.0 * wave - 1.0, 0.0, 1.0)
+    outer = np.stack((radii * np.cos(angles), radii * np.sin(angles)), axis=1)
+    return _ring_mesh(outer, _circle((0.0, 0.0), 3.0, n_points))
+
+
+def make_perforated_plate(n_edges: int, points_per_hole: int = 32) -> tuple:
+    """
+    Make a square plate with a grid of round holes. Each cell of the grid is
+    a ring between its square border and its hole, the duplicated vertices on
+    the borders between cells are merged by the welding of the extraction.
+    """
+    n_holes = max(n_edges // points_per_hole, 1)
+    n_cells = int(math.ceil(math.sqrt(n_holes)))
+    side = points_per_hole // 4
+
+    # the border of a unit cell, counter clockwise from its lower left corner
+    steps = np.arange(side) / side
+    border = np.concatenate((np.stack((steps, np.zeros(side)), axis=1),
+                             np.stack((np.ones(side), steps), axis=1),
+                             np.stack((1.0 - steps, np.ones(side)), axis=1),
+                             np.stack((np.zeros(side), 1.0 - steps), axis=1)))
+    # start the hole at the same angle as the border, such that no quad flips
+    hole = _circle((0.5, 0.5), 0.3, 4 * side)
+    hole = np.roll(hole, -((5 * side) // 2), axis=0)
+
+    cells = []
+    for i in range(n_cells):
+        for j in range(n_cells):
+            cells.append(_ring_mesh(border + (i, j), hole + (i, j)))
+    return _merge_meshes(cells)
+
+
+def make_text(n_edges: int, seed: int = 0) -> tuple:
+    """
+    Make many small separate glyph like shapes, solid blobs and blobs with a
+    counter (like an "o"), with a wavy outline of varying detail.
+    """
+    rng = np.random.RandomState(seed)
+    glyphs = []
+    total = 0
+    index = 0
+    n_columns = max(int(math.sqrt(n_edges / 24.0)), 1)
+    while total < n_edges:
+        center = (1.2 * (index % n_columns), 1.6 * (index // n_columns))
+        n_points = int(rng.randint(12, 48))
+        angles = np.linspace(0.0, 2.0 * math.pi, n_points, endpoint=False)
+        radii = 0.5 + 0.08 * np.sin(angles * rng.randint(2, 6) + rng.uniform(0.0, math.pi))
+        outer = np.stack((center[0] + radii * np.cos(angles), center[1] + radii * np.sin(angles)), axis=1)
+
+        if rng.uniform() < 0.5:
+            glyphs.append(_fan_mesh(outer))
+            total += n_points
+        else:
+            glyphs.append(_ring_mesh(outer, _circle(center, 0.25, n_points)))
+            total += 2 * n_points
+        index += 1
+    return _merge_meshes(glyphs)
+
+
+MESH_GENERATORS = { "gear": make_gear
+                  , "plate": make_perforated_plate
+                  , "text": make_text
+                  }
+
+
+# ------------------------------------------------------------------------------
+# Benchmark
+def _time(function, repeat: int) -> tuple:
+    """
+    Call function repeat times.
+
+    :returns: (the fastest wall time in seconds, the result of the last call)
+    """
+    best = math.inf
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_case(mesh_name: str, n_edges: int, settings: dict, directory: str) -> dict:
+    """
+    Generate the specified synthetic mesh and time each stage of the export
+    separately.
+
+    :param mesh_name: The name of the generator in MESH_GENERATORS.
+    :param n_edges: The approximate number of boundary edges of the mesh.
+    :param settings: The benchmark settings, containing repeat,
+                     simplify_tolerance and document_settings.
+    :param directory: The directory to which the svg files are written.
+
+    :returns: The result of the case with the size of the mesh and the fastest
+              time of each stage in seconds.
+    """
+    coordinates, face_vertices, face_sizes = MESH_GENERATORS[mesh_name](n_edges)
+    repeat = settings["repeat"]
+    stages = {}
+
+    stages["extraction"], outlines = _time(
+        lambda: lc.get_outlines_from_arrays(coordinates, face_vertices, face_sizes),
+        repeat)
+    stages["simplification"], simplified = _time(
+        lambda: lc.simplify_outlines(outlines, tolerance=settings["simplify_tolerance"]),
+        repeat)
+    stages["ordering"], ordered = _time(lambda: lc.order_cuts(simplified), repeat)
+
+    file_name = os.path.join(directory, "{}_{}.svg".format(mesh_name, n_edges))
+    stages["writing"], _ = _time(
+        lambda: lc.write_obj_to_svg(ordered,
+                                    {"x-neg": 0.0, "x-pos": 0.0, "y-neg": 0.0, "y-pos": 0.0},
+                                    file_name,
+                                    settings["document_settings"],
+                                    settings["unit_size"],
+                                    do_rotate=False),
+        repeat)
+
+    return {"mesh": mesh_name,
+            "target_edges": n_edges,
+            "vertices": len(coordinates),
+            "faces": len(face_sizes),
+            "boundary_edges": sum(len(outline) for outline in outlines),
+            "outlines": len(outlines),
+            "simplified_vertices": sum(len(outline) for outline in simplified),
+            "svg_bytes": os.path.getsize(file_name),
+            "seconds": stages}
+
+
+def get_environment() -> dict:
+    """ Get a description of the environment the benchmark runs in. """
+    return {"lasercut_version": lc.__version__,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def print_comparison(results: list, previous: dict):
+    """
+    Print the speed up of each stage compared with a previous run.
+
+    :param results: The results of this run.
+    :param previous: The contents of the json file of a previous run.
+    """
+    earlier = dict(((result["mesh"], result["target_edges"]), result["seconds"])
+                   for result in previous["results"])
+    for result in results:
+        key = (result["mesh"], result["target_edges"])
+        if key not in earlier:
+            continue
+        print("  {:<6} {:>8} edges: {}".format(
+            result["mesh"], result["target_edges"],
+            ", ".join("{} {:.2f}x".format(stage, earlier[key][stage] / seconds)
+                      for stage, seconds in sorted(result["seconds"].items())
+                      if stage in earlier[key] and seconds > 0.0)))
+
+
+# ------------------------------------------------------------------------------
+# Command line interface
+def parse_arguments(argv: list):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-o", "--output", default="lasercut_benchmark.json",
+                        help="The json file to which the results are written.")
+    parser.add_argument("--meshes", nargs="+", default=sorted(MESH_GENERATORS), choices=sorted(MESH_GENERATORS),
+                        help="The synthetic meshes to benchmark.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000, 1000000],
+                        help="The approximate numbers of boundary edges of each mesh.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="The number of times each stage is timed, the fastest time is kept.")
+    parser.add_argument("--simplify-tolerance", type=float, default=0.01,
+                        help="The simplification tolerance in mesh units.")
+    parser.add_argument("--compare", default=None,
+                        help="A json file of a previous run to compare the results with.")
+    return parser.parse_args(argv)
+
+
+def main(argv: list):
+    args = parse_arguments(argv)
+    settings = {"repeat": args.repeat,
+                "simplify_tolerance": args.simplify_tolerance,
+                "unit_size": lc.construct_unit_dict(96.0)["mm"],
+                "document_settings": {"profile": "tiny",
+                                      "debug": False,
+                                      "precision": 3,
+                                      "relative": True,
+                                      "stroke": "black",
+                                      "stroke-width": 1.0,
+                                      "fill": "white",
+                                      "fill-opacity": 0.0}}
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_edges in args.sizes:
+            for mesh_name in args.meshes:
+                result = run_case(mesh_name, n_edges, settings, directory)
+                results.append(result)
+                print("  {:<6} {:>8} edges: {}".format(
+                    mesh_name, result["boundary_edges"],
+                    ", ".join("{} {:.4f}s".format(stage, seconds)
+                              for stage, seconds in sorted(result["seconds"].items()))))
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": get_environment(),
+                   "settings": dict(settings, document_settings=None),
+                   "results": results}, f, indent=2)
+    print("Results written to {}".format(args.output))
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print("Speed up compared with {}:".format(args.compare))
+        print_comparison(results, previous)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,457 @@
+#!/usr/bin/env python
+"""
+Export flat parts stored as STL, PLY or OBJ files to SVG files, to be laser
+cut, without running blender.
+"""
+
+# ------------------------------------------------------------------------------
+# Libraries
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+import lasercut_svg_export as lc
+
+
+# ------------------------------------------------------------------------------
+# Author information
+__author__ = "Maarten Tegelaers"
+__copyright__ = "Copyright 2018, Maarten Tegelaers"
+
+__license__ = "All Rights Reserved"
+__version__ = "0.1"
+__status__ = "development"
+
+
+# ------------------------------------------------------------------------------
+# Mesh readers
+# All readers return (coordinates, face_vertices, face_sizes), where
+# coordinates is an (N, 3) float array, face_vertices the flat array of the
+# vertex indices of all faces and face_sizes the number of vertices per face.
+STL_RECORD = np.dtype([("normal", "<f4", (3,)),
+                       ("vertices", "<f4", (3, 3)),
+                       ("attribute", "<u2")])
+
+PLY_TYPES = { "char": "i1", "int8": "i1"
+            , "uchar": "u1", "uint8": "u1"
+            , "short": "i2", "int16": "i2"
+            , "ushort": "u2", "uint16": "u2"
+            , "int": "i4", "int32": "i4"
+            , "uint": "u4", "uint32": "u4"
+            , "float": "f4", "float32": "f4"
+            , "double": "f8", "float64": "f8"
+            }
+
+PLY_BYTE_ORDER = { "binary_little_endian": "<"
+                 , "binary_big_endian": ">"
+                 , "ascii": "="
+                 }
+
+
+def _merge_triangle_soup(corners: np.ndarray) -> tuple:
+    """
+    Merge the identical corners of the specified triangles into shared
+    vertices.
+
+    :param corners: The (F * 3, 3) array of triangle corner coordinates
+
+    :returns: (coordinates, face_vertices, face_sizes)
+    """
+    coordinates, face_vertices = np.unique(corners, axis=0, return_inverse=True)
+    face_sizes = np.full(len(corners) // 3, 3, dtype=np.int64)
+    return coordinates.astype(np.float64), face_vertices.ravel(), face_sizes
+
+
+def read_stl(file_path: Path) -> tuple:
+    """
+    Read the binary or ascii STL file at file_path.
+
+    :param file_path: The path to the STL file
+
+    :returns: (coordinates, face_vertices, face_sizes)
+    """
+    data = np.memmap(str(file_path), dtype=np.uint8, mode="r")
+    n_triangles = int(np.frombuffer(data, dtype="<u4", count=1, offset=80)[0]) if len(data) >= 84 else -1
+
+    # ascii files start with "solid" as well, but their size does not match
+    # the triangle count of the binary header.
+    if len(data) == 84 + n_triangles * STL_RECORD.itemsize:
+        records = np.frombuffer(data, dtype=STL_RECORD, count=n_triangles, offset=84)
+        return _merge_triangle_soup(records["vertices"].reshape(-1, 3))
+
+    text = data.tobytes().decode("ascii", errors="replace")
+    values = re.findall(r"vertex\s+(\S+)\s+(\S+)\s+(\S+)", text)
+    corners = np.array(values, dtype=np.float64).reshape(-1, 3)
+    return _merge_triangle_soup(corners)
+
+
+def _read_ply_header(file_path: Path) -> tuple:
+    """
+    Read the header of the PLY file at file_path.
+
+    :returns: (format, elements, header size), where elements is a list of
+              (name, count, properties) and properties a list of
+              (name, type, list count type or None)
+    """
+    lines = []
+    header_size = 0
+    with open(str(file_path), "rb") as f:
+        for line in f:
+            header_size += len(line)
+            lines.append(line.decode("ascii"))
+            if line.startswith(b"end_header"):
+                break
+
+    if lines[0].strip() != "ply":
+        raise Exception("Not a PLY file")
+
+    ply_format = None
+    elements = []
+    for line in lines[1:]:
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == "format":
+            ply_format = words[1]
+        elif words[0] == "element":
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == "property" and words[1] == "list":
+            elements[-1][2].append((words[4], PLY_TYPES[words[3]], PLY_TYPES[words[2]]))
+        elif words[0] == "property":
+            elements[-1][2].append((words[2], PLY_TYPES[words[1]], None))
+    return ply_format, elements, header_size
+
+
+def _read_ply_binary_faces(data, offset: int, count: int, properties: list, byte_order: str) -> tuple:
+    """
+    Read the face element of a binary PLY file, assuming all faces have the
+    same size as the first one, and falling back to a per face read if not.
+
+    :returns: (face_vertices, face_sizes, offset after the element)
+    """
+    list_index = next(i for i, prop in enumerate(properties)
+                      if prop[0] in ("vertex_indices", "vertex_index"))
+
+    def field_type(prop):
+        return np.dtype(byte_order + prop[1])
+
+    # Fast path, uniform faces are a fixed size record
+    fields = [(prop[0], field_type(prop)) for prop in properties[:list_index]]
+    size_type = np.dtype(byte_order + properties[list_index][2])
+    first_size = int(np.frombuffer(data, dtype=size_type, count=1,
+                                   offset=offset + np.dtype(fields).itemsize)[0])
+
+    fields.append(("size", size_type))
+    fields.append(("vertices", field_type(properties[list_index]), (first_size,)))
+    for prop in properties[list_index + 1:]:
+        if prop[2] is not None:
+            fields = None
+            break
+        fields.append((prop[0], field_type(prop)))
+
+    if fields is not None:
+        record = np.dtype(fields)
+        if offset + count * record.itemsize <= len(data):
+            faces = np.frombuffer(data, dtype=record, count=count, offset=offset)
+            if (faces["size"] == first_size).all():
+                face_sizes = np.full(count, first_size, dtype=np.int64)
+                return faces["vertices"].ravel().astype(np.int64), face_sizes, offset + count * record.itemsize
+
+    # Slow path, mixed face sizes
+    face_vertices = []
+    face_sizes = np.empty(count, dtype=np.int64)
+    for face in range(count):
+        for i, prop in enumerate(properties):
+            if prop[2] is None:
+                offset += field_type(prop).itemsize
+                continue
+            list_size_type = np.dtype(byte_order + prop[2])
+            n = int(np.frombuffer(data, dtype=list_size_type, count=1, offset=offset)[0])
+            offset += list_size_type.itemsize
+            values = np.frombuffer(data, dtype=field_type(prop), count=n, offset=offset)
+            offset += n * field_type(prop).itemsize
+            if i == list_index:
+                face_vertices.append(values)
+                face_sizes[face] = n
+    return np.concatenate(face_vertices).astype(np.int64), face_sizes, offset
+
+
+def read_ply(file_path: Path) -> tuple:
+    """
+    Read the binary or ascii PLY file at file_path.
+
+    :param file_path: The path to the PLY file
+
+    :returns: (coordinates, face_vertices, face_sizes)
+    """
+    ply_format, elements, offset = _read_ply_header(file_path)
+    data = np.memmap(str(file_path), dtype=np.uint8, mode="r")
+
+    if ply_format == "ascii":
+        return _read_ply_ascii(data[offset:].tobytes().decode("ascii").split(), elements)
+
+    byte_order = PLY_BYTE_ORDER[ply_format]
+    coordinates = None
+    face_vertices = None
+    face_sizes = None
+
+    for name, count, properties in elements:
+        if name == "face":
+            face_vertices, face_sizes, offset = _read_ply_binary_faces(data, offset, count, properties, byte_order)
+            continue
+        if any(prop[2] is not None for prop in properties):
+            raise Exception("Unsupported list property in element {}".format(name))
+
+        record = np.dtype([(prop[0], byte_order + prop[1]) for prop in properties])
+        values = np.frombuffer(data, dtype=record, count=count, offset=offset)
+        offset += count * record.itemsize
+
+        if name == "vertex":
+            coordinates = np.stack((values["x"], values["y"], values["z"]), axis=1).astype(np.float64)
+
+    return coordinates, face_vertices, face_sizes
+
+
+def _read_ply_ascii(words: list, elements: list) -> tuple:
+    """
+    Read the body of an ascii PLY file split into words.
+
+    :returns: (coordinates, face_vertices, face_sizes)
+    """
+    position = 0
+    coordinates = None
+    face_vertices = []
+    face_sizes = []
+
+    for name, count, properties in elements:
+        if all(prop[2] is None for prop in properties):
+            n_words = count * len(properties)
+            values = np.array(words[position:position + n_words], dtype=np.float64).reshape(count, -1)
+            position += n_words
+            if name == "vertex":
+                names = [prop[0] for prop in properties]
+                coordinates = values[:, [names.index("x"), names.index("y"), names.index("z")]]
+            continue
+
+        for _ in range(count):
+            for prop in properties:
+                if prop[2] is None:
+                    position += 1
+                    continue
+                n = int(words[position])
+                if name == "face" and prop[0] in ("vertex_indices", "vertex_index"):
+                    face_vertices.extend(words[position + 1:position + 1 + n])
+                    face_sizes.append(n)
+                position += 1 + n
+
+    return (coordinates,
+            np.array(face_vertices, dtype=np.int64),
+            np.array(face_sizes, dtype=np.int64))
+
+
+def read_obj(file_path: Path) -> tuple:
+    """
+    Read the Wavefront OBJ file at file_path, only vertices and faces are
+    read.
+
+    :param file_path: The path to the OBJ file
+
+    :returns: (coordinates, face_vertices, face_sizes)
+    """
+    with open(str(file_path), "r") as f:
+        lines = f.read().splitlines()
+
+    coordinates = []
+    face_vertices = []
+    face_sizes = []
+    for line in lines:
+        if line.startswith("v "):
+            coordinates.append(line.split()[1:4])
+        elif line.startswith("f "):
+            face = line.split()[1:]
+            face_vertices.extend(corner.split("/", 1)[0] for corner in face)
+            face_sizes.append(len(face))
+
+    coordinates = np.array(coordinates, dtype=np.float64)
+    face_vertices = np.array(face_vertices, dtype=np.int64)
+
+    # obj indices are one based, negative indices count back from the end
+    face_vertices = np.where(face_vertices < 0,
+                             face_vertices + len(coordinates),
+                             face_vertices - 1)
+    return coordinates, face_vertices, np.array(face_sizes, dtype=np.int64)
+
+
+MESH_READERS = { ".stl": read_stl
+               , ".ply": read_ply
+               , ".obj": read_obj
+               }
+
+
+def read_mesh(file_path: Path) -> tuple:
+    """
+    Read the mesh at file_path with the reader matching its suffix.
+
+    :param file_path: The path to the mesh file
+
+    :returns: (coordinates, face_vertices, face_sizes)
+    """
+    suffix = file_path.suffix.lower()
+    if suffix not in MESH_READERS:
+        raise Exception("Unsupported mesh format: {}".format(suffix))
+    return MESH_READERS[suffix](file_path)
+
+
+# ------------------------------------------------------------------------------
+# Command line interface
+def parse_arguments(argv: list):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("meshes", nargs="+", type=Path,
+                        help="The STL, PLY or OBJ files of the flat parts to export.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("."),
+                        help="The directory to which the svg files are written.")
+    parser.add_argument("--unit", default="cm", choices=["px", "pt", "pc", "in", "mm", "cm"],
+                        help="The unit of a single mesh unit.")
+    parser.add_argument("--units-per-inch", type=float, default=96.0,
+                        help="The number of pixels per inch, 90 according to the svg spec, 96 for Inkscape.")
+    parser.add_argument("--padding", type=float, default=1.0,
+                        help="The padding around each part in mesh units.")
+    parser.add_argument("--rotate", default="none", choices=["none", "longest-edge", "minimum-area"],
+                        help="How to rotate each part.")
+    parser.add_argument("--simplify-tolerance", type=float, default=0.0,
+                        help="The simplification tolerance in mesh units.")
+    parser.add_argument("--weld-tolerance", type=float, default=lc.WELD_TOLERANCE,
+                        help="Merge vertices within this distance in mesh units before tracing the outlines.")
+    parser.add_argument("--split-islands", action="store_true",
+                        help="Split each mesh into its planar islands, e.g. the panels of a folded assembly.")
+    parser.add_argument("--simplify-method", default="douglas-peucker", choices=sorted(lc.SIMPLIFY_METHODS))
+    parser.add_argument("--precision", type=int, default=4,
+                        help="The number of decimals of each coordinate.")
+    parser.add_argument("--no-order", action="store_true",
+                        help="Keep the traced order of the outlines instead of ordering them to reduce laser travel.")
+    parser.add_argument("--absolute", action="store_true",
+                        help="Write absolute instead of relative path commands.")
+    parser.add_argument("--curve-tolerance", type=float, default=None,
+                        help="Fit arcs to the outlines within this tolerance in mesh units.")
+    parser.add_argument("--fit-beziers", action="store_true",
+                        help="Also fit cubic Beziers, requires --curve-tolerance.")
+    parser.add_argument("--validate", action="store_true",
+                        help="Build and validate the svg with svgwrite instead of streaming it.")
+    parser.add_argument("--nest", type=float, nargs=2, metavar=("WIDTH", "HEIGHT"), default=None,
+                        help="Nest all parts onto sheets of this size in mesh units, one svg per sheet.")
+    parser.add_argument("--spacing", type=float, default=0.3,
+                        help="The minimum distance between nested parts in mesh units.")
+    parser.add_argument("--refine", action="store_true",
+                        help="Refine the nesting with the actual part outlines.")
+    parser.add_argument("--tile", type=float, nargs=2, metavar=("WIDTH", "HEIGHT"), default=None,
+                        help="Split each part over tiles of a laser bed of this size in mesh units.")
+    parser.add_argument("--tile-margin", type=float, default=lc.TILE_MARGIN,
+                        help="The margin around each tile, holding its registration marks, in mesh units.")
+    parser.add_argument("--report", default=None,
+                        help="Write the time and counters of each stage of every export to this json file.")
+    parser.add_argument("--profile", default=None, metavar="MESH",
+                        help="Dump a cProfile of the export of this mesh next to its svg file.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Export all parts, instead of skipping parts of which the svg is up to date.")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="The number of worker processes, defaults to the number of cores.")
+    return parser.parse_args(argv)
+
+
+def main(argv: list):
+    args = parse_arguments(argv)
+
+    unit_dict = lc.construct_unit_dict(args.units_per_inch)
+    unit_size = unit_dict[args.unit]
+    padding = args.padding * unit_size
+
+    export_settings = {"padding": {"x-neg": padding,
+                                   "x-pos": padding,
+                                   "y-neg": padding,
+                                   "y-pos": padding},
+                       "document_settings": {"profile": "tiny",
+                                             "debug": args.validate,
+                                             "precision": args.precision,
+                                             "relative": not args.absolute,
+                                             "curve-tolerance": args.curve_tolerance,
+                                             "fit-beziers": args.fit_beziers,
+                                             "stroke": "black",
+                                             "stroke-width": 1.0,
+                                             "fill": "white",
+                                             "fill-opacity": 0.0},
+                       "unit_size": unit_size,
+                       "do_rotate": args.rotate != "none",
+                       "rotation_mode": args.rotate,
+                       "simplify_tolerance": args.simplify_tolerance,
+                       "simplify_method": args.simplify_method,
+                       "order_cuts": not args.no_order,
+                       "weld_tolerance": args.weld_tolerance,
+                       "split_islands": args.split_islands}
+
+    if not args.output.exists():
+        args.output.mkdir(parents=True)
+
+    start = time.perf_counter()
+    unreadable = []
+
+    def iter_jobs():
+        # the meshes are read as the export consumes them, such that only a
+        # few of them are in memory at once
+        for mesh_path in args.meshes:
+            file_name = str(args.output / mesh_path.with_suffix(".svg").name)
+            try:
+                coordinates, face_vertices, face_sizes = read_mesh(mesh_path)
+            except Exception as e:
+                unreadable.append({"name": str(mesh_path),
+                                   "file_name": file_name,
+                                   "outlines": 0,
+                                   "vertices": 0,
+                                   "error": "{}: {}".format(type(e).__name__, e),
+                                   "seconds": 0.0})
+                continue
+            yield (str(mesh_path), coordinates, face_vertices, face_sizes,
+                   file_name, export_settings)
+
+    if args.tile is not None:
+        tiled = lc.export_tiled((job[:4] + (str(args.output / "{}_{{}}_{{}}.svg".format(Path(job[0]).stem)),)
+                                 for job in iter_jobs()),
+                                export_settings,
+                                {"bed_size": tuple(args.tile),
+                                 "margin": args.tile_margin})
+        for summary in unreadable:
+            print("  FAILED    {}: {}".format(summary["name"], summary["error"]))
+        lc.print_tile_summary(tiled, time.perf_counter() - start)
+        return 1 if unreadable else 0
+
+    if args.nest is not None:
+        sheets = lc.export_nested((job[:4] for job in iter_jobs()),
+                                  export_settings,
+                                  {"sheet_size": tuple(args.nest),
+                                   "spacing": args.spacing,
+                                   "allow_rotation": True,
+                                   "refine": args.refine},
+                                  str(args.output / "sheet_{}.svg"))
+        for summary in unreadable:
+            print("  FAILED    {}: {}".format(summary["name"], summary["error"]))
+        lc.print_nest_summary(sheets, time.perf_counter() - start)
+        return 1 if unreadable else 0
+
+    cache = None if args.no_cache else lc.ExportCache(str(args.output / lc.EXPORT_CACHE_FILE))
+    summaries = lc.export_batch(iter_jobs(), args.workers, cache, args.profile) + unreadable
+    lc.print_batch_summary(summaries, time.perf_counter() - start)
+
+    if args.report is not None:
+        report = lc.get_export_report(summaries)
+        lc.print_export_report(report)
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(summary["error"] for summary in summaries) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
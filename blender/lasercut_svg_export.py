@@ -1,17 +1,33 @@
 """
 Export two dimensional objects in blender to SVG files, to be laser cut.
+
+The geometry core (outline extraction from vertex and face arrays, projection,
+simplification and svg writing) does not depend on blender, and is used by
+lasercut_cli.py to export meshes read from files.
 """
 
 # ------------------------------------------------------------------------------
 # Libraries
+import collections
+import contextlib
+import cProfile
+import hashlib
+import heapq
+import json
 import math
-import sys
+import multiprocessing
+import os
+import time
+from xml.sax.saxutils import quoteattr
 
+import numpy as np
 import svgwrite
 
-import bpy
-import mathutils
-import bmesh
+try:
+    import bpy
+except ImportError:
+    # Running outside of blender, only the geometry core is available.
+    bpy = None
 
 
 # ------------------------------------------------------------------------------
@@ -23,6 +39,14 @@ __license__ = "All Rights Reserved"
 __version__ = "0.1"
 __status__ = "development"
 
+bl_info = {"name": "Laser cut svg export",
+           "author": "Maarten Tegelaers",
+           "version": (0, 1),
+           "blender": (2, 79, 0),
+           "location": "Re-exports LC objects next to the blend file when edited",
+           "description": "Export two dimensional objects to svg files, to be laser cut",
+           "category": "Import-Export"}
+
 
 # ------------------------------------------------------------------------------
 # Units
@@ -55,7 +79,13 @@ class VertexInternal(object):
     '''
     Two dimensional Vertex class used to represent points of the exported
     outline.
+
+    A VertexInternal is a lightweight view onto a row of the coordinate array
+    of an Outline, such that changes made through it are reflected in the
+    Outline and vice versa.
     '''
+    __slots__ = ("_index", "_coordinates", "_row")
+
     def __init__(self, index: int, x: float, y: float):
         """
         Construct a new VertexInternal with the specified index and coordinates
@@ -67,18 +97,36 @@ class VertexInternal(object):
         :returns: A new VertexInternal with the specified parameters
         """
         self._index = index
-        self._x = x
-        self._y = y
+        self._coordinates = np.array([[x, y]], dtype=np.float64)
+        self._row = 0
+
+    @classmethod
+    def view(cls, coordinates: np.ndarray, row: int, index: int):
+        """
+        Construct a new VertexInternal viewing the specified row of the
+        coordinates array.
+
+        :param coordinates: The (N, 2) coordinate array viewed
+        :param row: The row of coordinates this VertexInternal represents
+        :param index: The unique index of this new VertexInternal
+
+        :returns: A new VertexInternal viewing coordinates[row]
+        """
+        vert = cls.__new__(cls)
+        vert._index = index
+        vert._coordinates = coordinates
+        vert._row = row
+        return vert
 
     @property
     def x(self) -> float:
         """ The x-coordinate of this VertexInternal. """
-        return self._x
+        return float(self._coordinates[self._row, 0])
 
     @property
     def y(self) -> float:
         """ The y-coordinate of this VertexInternal. """
-        return self._y
+        return float(self._coordinates[self._row, 1])
 
     @property
     def index(self) -> float:
@@ -91,8 +139,9 @@ class VertexInternal(object):
 
         :param angle: The angle by which this VertexInternal should be rotated.
         """
-        self._x = self.x * math.cos(angle) - self.y * math.sin(angle)
-        self._y = self.x * math.sin(angle) + self.y * math.cos(angle)
+        x, y = self.x, self.y
+        self._coordinates[self._row] = (x * math.cos(angle) - y * math.sin(angle),
+                                        x * math.sin(angle) + y * math.cos(angle))
 
     def distance_to(self, vert) -> float:
         """
@@ -118,126 +167,334 @@ class VertexInternal(object):
 
 class Outline(object):
     """
-    The Outline holds a set of VertexInternal objects which specify the
-    a closed path.
+    The Outline holds the coordinates of a closed path as a contiguous (N, 2)
+    array of x and y coordinates. Outlines which are cut off, e.g. at the
+    boundary of a tile, are open paths.
     """
-    def __init__(self, verts: list):
-        self._verts = verts
+    def __init__(self, coordinates, first_index: int = 0, is_closed: bool = True):
+        """
+        Construct a new Outline with the specified coordinates.
+
+        :param coordinates: The (N, 2) array of coordinates, or a list of
+                            VertexInternal objects, specifying the path.
+        :param first_index: The index of the first vertex of this Outline,
+                            used to give the VertexInternal views a unique
+                            index.
+        :param is_closed: Whether the path returns from the last vertex to the
+                          first vertex.
+        """
+        if len(coordinates) > 0 and isinstance(coordinates[0], VertexInternal):
+            first_index = coordinates[0].index
+            coordinates = [(vert.x, vert.y) for vert in coordinates]
+
+        self._coordinates = np.ascontiguousarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        self._first_index = first_index
+        self._is_closed = is_closed
+
+    @property
+    def coordinates(self) -> np.ndarray:
+        """
+        The (N, 2) coordinate array which specifies the path of this Outline.
+        """
+        return self._coordinates
+
+    @property
+    def first_index(self) -> int:
+        """ The unique index of the first vertex of this Outline. """
+        return self._first_index
+
+    @property
+    def is_closed(self) -> bool:
+        """ Whether the path of this Outline is closed. """
+        return self._is_closed
 
     @property
     def verts(self) -> list:
         """
-        Return a copy of the VertexInternal objects which specify the path
+        Return VertexInternal views of the vertices which specify the path
         of this Outline
         """
-        return self._verts
+        return list(VertexInternal.view(self._coordinates, row, self._first_index + row)
+                    for row in range(len(self._coordinates)))
+
+    def __len__(self):
+        return len(self._coordinates)
+
+    def rotate_by(self, angle: float):
+        """
+        Rotate all coordinates of this Outline by the specified angle.
+
+        :param angle: The angle in radians by which this Outline is rotated.
+        """
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+        rotation = np.array([[cos_a, sin_a],
+                             [-sin_a, cos_a]])
+        self._coordinates[:] = np.dot(self._coordinates, rotation)
+
+    def translate_by(self, x: float, y: float):
+        """
+        Translate all coordinates of this Outline by the specified offset.
+
+        :param x: The offset along the x-axis
+        :param y: The offset along the y-axis
+        """
+        self._coordinates += (x, y)
+
+    def scale_by(self, factor: float):
+        """
+        Scale all coordinates of this Outline by the specified factor.
+
+        :param factor: The factor by which the coordinates are scaled.
+        """
+        self._coordinates *= factor
 
 
 # ------------------------------------------------------------------------------
-# Math support functions
-def skew_symmetric_matrix(v: mathutils.Vector) -> mathutils.Matrix:
-    """
-    Get the skew symmetric matrix based upon the specified vector
+# Instrumentation
+# The report of the object being exported by this process, stages and counters
+# are only recorded while it is set, see instrument.
+_active_report = None
 
-    :param v: The vector with which the skew symmetric matrix is constructed
 
-    :returns: The skew symmetric matrix constructed with v
+class ExportReport(object):
+    """
+    The ExportReport records the wall time spent in each stage of the export
+    of a single object, and counters such as the number of vertices, boundary
+    edges, loops and bytes written.
     """
-    return mathutils.Matrix(([    0, -v.z,  v.y],
-                             [  v.z,    0, -v.x],
-                             [ -v.y,  v.x,    0]))
+    def __init__(self):
+        """
+        Construct a new empty ExportReport.
+        """
+        self._seconds = {}
+        self._counts = {}
 
+    def add_time(self, stage: str, seconds: float):
+        """
+        Add the specified wall time to stage.
 
-def calculate_angle(shared_vert: VertexInternal,
-                    other_vert_a: VertexInternal,
-                    other_vert_b: VertexInternal) -> float:
-    """
-    Calculate the angle between the vectors shared_vert | other_vert_a
-    and shared_vert | other_vert_b
+        :param stage: The name of the stage.
+        :param seconds: The wall time in seconds.
+        """
+        self._seconds[stage] = self._seconds.get(stage, 0.0) + seconds
 
-    :param shared_vert: The VertexInternal shared by the two vectors
-    :param other_vert_a: The VertexInternal corresponding with the end point
-                         of one of the vectors.
-    :param other_vert_b: The VertexInternal corresponding with the end point
-                         of the other vector.
+    def add_count(self, counter: str, value: int = 1):
+        """
+        Add the specified value to counter.
 
-    :returns: The angle between the specified vectors in radians.
-    """
-    vec_a = (other_vert_a.x - shared_vert.x,
-             other_vert_a.y - shared_vert.y)
-    vec_b = (other_vert_b.x - shared_vert.x,
-             other_vert_b.y - shared_vert.y)
-    len_a = math.sqrt(vec_a[0] * vec_a[0] + vec_a[1] * vec_a[1])
-    len_b = math.sqrt(vec_b[0] * vec_b[0] + vec_b[1] * vec_b[1])
+        :param counter: The name of the counter.
+        :param value: The value to add.
+        """
+        self._counts[counter] = self._counts.get(counter, 0) + value
+
+    def as_dict(self) -> dict:
+        """
+        Get this ExportReport as a dict with the seconds of each stage and
+        the counts of each counter.
+        """
+        return {"seconds": dict(self._seconds), "counts": dict(self._counts)}
 
-    dot_product = vec_a[0] * vec_b[0] + vec_a[1] * vec_b[1]
-    angle = math.acos(dot_product / (len_a * len_b))
-    return angle
 
+@contextlib.contextmanager
+def instrument(report: ExportReport):
+    """
+    Make the specified ExportReport the active report of this process while
+    the context is entered, such that the stages of the export record into it.
 
-def get_rotation_matrix_from_normal(normal : mathutils.Vector):
+    :param report: The report to record into.
     """
-    Construct the rotation matrix to rotate the specified normal vector
-    onto the (0.0, 0.0, 1.0) vector
+    global _active_report
+    previous = _active_report
+    _active_report = report
+    try:
+        yield report
+    finally:
+        _active_report = previous
+
 
-    :param normal: The normal vector used to construct the rotation matrix
+@contextlib.contextmanager
+def stage(name: str):
+    """
+    Add the wall time of the context to the specified stage of the active
+    report, if any.
 
-    :returns: The rotation matrix to align the normal vector with the z-axis.
+    :param name: The name of the stage.
     """
-    vec_z = mathutils.Vector((0.0, 0.0, 1.0))
-    c = normal.dot(vec_z)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _active_report is not None:
+            _active_report.add_time(name, time.perf_counter() - start)
 
-    if fuzzy_equals(c, 1) or fuzzy_equals(c, -1):
-        return mathutils.Matrix.Identity(3)
 
-    v = normal.cross(vec_z)
+def count(counter: str, value: int = 1):
+    """
+    Add the specified value to counter of the active report, if any.
 
-    v_skew = skew_symmetric_matrix(v)
-    R = mathutils.Matrix.Identity(3) + v_skew + (v_skew * v_skew * (1.0 / 1.0 + c))
-    return R
+    :param counter: The name of the counter.
+    :param value: The value to add.
+    """
+    if _active_report is not None:
+        _active_report.add_count(counter, value)
 
 
-def get_rotation_quaternion_from_normal(normal : mathutils.Vector):
+# ------------------------------------------------------------------------------
+# Math support functions
+def get_quaternion_from_normal(normal) -> tuple:
     """
     Construct the rotation quaternion to rotate the specified normal vector
-    onto the (0.0, 0.0, 1.0) vector
+    onto the (0.0, 0.0, 1.0) vector.
 
-    :param normal: The normal vector used to construct the rotation quaternion
+    :param normal: The (x, y, z) normal vector used to construct the rotation
+                   quaternion
 
-    :returns: The rotation quaternion to align the normal with the z-axis
+    :returns: The rotation quaternion as (w, x, y, z)
     """
-    vec_z = mathutils.Vector((0.0, 0.0, 1.0))
-    theta = normal.angle(vec_z) # angle
-    axis  = normal.cross(vec_z) # axis
-    axis.normalize()
+    n_x, n_y, n_z = (float(c) for c in normal)
+    length = math.sqrt(n_x * n_x + n_y * n_y + n_z * n_z)
+    n_x, n_y, n_z = n_x / length, n_y / length, n_z / length
+
+    # axis = normal x (0, 0, 1)
+    axis_length = math.hypot(n_x, n_y)
+    if axis_length == 0.0:
+        # (anti-)parallel to the z-axis, flip around the x-axis if required
+        return (1.0, 0.0, 0.0, 0.0) if n_z > 0.0 else (0.0, 1.0, 0.0, 0.0)
 
+    theta = math.acos(max(-1.0, min(1.0, n_z)))
     sin_theta = math.sin(theta / 2.0)
-    q_rot = mathutils.Quaternion((math.cos(theta / 2.0),
-                                  axis.x * sin_theta,
-                                  axis.y * sin_theta,
-                                  axis.z * sin_theta))
+    return (math.cos(theta / 2.0),
+            n_y / axis_length * sin_theta,
+            -n_x / axis_length * sin_theta,
+            0.0)
+
+
+def get_rotation_array_from_quaternion(quaternion) -> np.ndarray:
+    """
+    Construct the 3x3 rotation matrix, as a numpy array, that applies the
+    same rotation as the specified unit quaternion.
+
+    :param quaternion: The rotation quaternion specified as (w, x, y, z)
+
+    :returns: The (3, 3) rotation matrix equivalent to quaternion
+    """
+    w, x, y, z = (float(c) for c in quaternion)
+    return np.array([[1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - z * w), 2.0 * (x * z + y * w)],
+                     [2.0 * (x * y + z * w), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - x * w)],
+                     [2.0 * (x * z - y * w), 2.0 * (y * z + x * w), 1.0 - 2.0 * (x * x + y * y)]])
 
-    q_norm = mathutils.Quaternion((0.0, normal.x, normal.y, normal.z))
-    rot = q_rot * q_norm * q_rot.conjugated()
 
-    print(normal)
-    print(axis)
-    print(mathutils.Vector((rot.x, rot.y, rot.z)))
+def project_coordinates(coordinates: np.ndarray, rotation_quaternion) -> np.ndarray:
+    """
+    Project all specified coordinates onto the cut plane in a single matrix
+    multiply.
 
-    return q_rot
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param rotation_quaternion: The rotation quaternion which aligns the normal
+                                of the cut plane with the z-axis.
 
+    :returns: The (N, 2) array of projected x and y coordinates
+    """
+    rotation = get_rotation_array_from_quaternion(rotation_quaternion)
+    return np.dot(coordinates, rotation[:2].T)
 
 
-def fuzzy_equals(a: float, b: float) -> bool:
+def fuzzy_equals(a: float, b: float, tolerance: float = 1e-6) -> bool:
     """
     Compare float a and float b on equality
 
     :param a: one of the floats to be compared
     :param b: the other float to be compared
+    :param tolerance: the absolute difference below which a and b are equal,
+                      relative to the magnitude of a and b if they exceed one
 
     :returns: True if a==b False otherwise
     """
-    return abs(a - b) <= sys.float_info.epsilon
+    return abs(a - b) <= tolerance * max(1.0, abs(a), abs(b))
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """
+    Determine which of the specified points lie inside the closed polygon
+    with the even-odd (crossing number) rule.
+
+    :param points: The (M, 2) array of points to test.
+    :param polygon: The (N, 2) coordinates of the closed polygon.
+
+    :returns: The (M,) boolean array, True for the points inside polygon.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    starts = polygon
+    ends = np.roll(polygon, -1, axis=0)
+
+    x = points[:, 0][:, None]
+    y = points[:, 1][:, None]
+
+    # edges crossing the horizontal line through each point
+    crosses = (starts[:, 1] > y) != (ends[:, 1] > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = starts[:, 0] + (y - starts[:, 1]) * (ends[:, 0] - starts[:, 0]) / (ends[:, 1] - starts[:, 1])
+    return ((crosses & (x < x_cross)).sum(axis=1) % 2) == 1
+
+
+def get_signed_area(coordinates: np.ndarray) -> float:
+    """
+    Calculate the signed area of the closed polygon with the shoelace formula.
+
+    :param coordinates: The (N, 2) coordinates of the closed polygon.
+
+    :returns: The area, positive if the polygon is counter clockwise and
+              negative if it is clockwise.
+    """
+    x = coordinates[:, 0]
+    y = coordinates[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def segments_within(segments_a: np.ndarray, segments_b: np.ndarray, distance: float) -> bool:
+    """
+    Determine whether any segment of segments_a intersects or lies within
+    distance of any segment of segments_b.
+
+    :param segments_a: The (N, 2, 2) array of segment end points.
+    :param segments_b: The (M, 2, 2) array of segment end points.
+    :param distance: The minimum allowed distance between the segments.
+
+    :returns: True if any pair of segments is closer than distance.
+    """
+    if len(segments_a) == 0 or len(segments_b) == 0:
+        return False
+
+    a0 = segments_a[:, None, 0]
+    a1 = segments_a[:, None, 1]
+    b0 = segments_b[None, :, 0]
+    b1 = segments_b[None, :, 1]
+
+    def cross(o, p, q):
+        return (p[..., 0] - o[..., 0]) * (q[..., 1] - o[..., 1]) - (p[..., 1] - o[..., 1]) * (q[..., 0] - o[..., 0])
+
+    # proper intersections
+    d1 = cross(b0, b1, a0)
+    d2 = cross(b0, b1, a1)
+    d3 = cross(a0, a1, b0)
+    d4 = cross(a0, a1, b1)
+    if (((d1 > 0) != (d2 > 0)) & ((d3 > 0) != (d4 > 0))).any():
+        return True
+
+    def point_segment_distance(p, s0, s1):
+        segment = s1 - s0
+        length_sq = (segment * segment).sum(axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.clip(((p - s0) * segment).sum(axis=-1) / length_sq, 0.0, 1.0)
+        t = np.where(length_sq > 0.0, t, 0.0)
+        closest = s0 + t[..., None] * segment
+        return np.hypot(p[..., 0] - closest[..., 0], p[..., 1] - closest[..., 1])
+
+    return bool((point_segment_distance(a0, b0, b1) < distance).any() or
+                (point_segment_distance(a1, b0, b1) < distance).any() or
+                (point_segment_distance(b0, a0, a1) < distance).any() or
+                (point_segment_distance(b1, a0, a1) < distance).any())
 
 
 # ------------------------------------------------------------------------------
@@ -269,249 +526,3368 @@ def get_selected_objects(only_selected : bool,
 
 # ------------------------------------------------------------------------------
 # Construct outline out of the selected objects
-def _to_vert_internal(vertex, index, rotation_matrix, height):
-    vec2d = rotation_matrix * vertex.co
+WELD_TOLERANCE = 1e-6
+ISLAND_ANGLE_TOLERANCE = math.radians(1.0)
+# the smallest cell size of the normal grid, which keeps its keys within int64
+ISLAND_MIN_CELL_SIZE = 1e-5
+
+
+def iter_boundary_loops(edges: list):
+    """
+    Trace the closed loops formed by the specified boundary edges, yielding
+    each loop as soon as it is closed.
+
+    A vertex to boundary edge adjacency index is built once, after which every
+    edge is visited exactly once, such that all loops are traced in O(E).
+
+    :param edges: The boundary edges specified as (vertex index, vertex index)
+                  pairs.
+
+    :returns: A generator yielding the loops, each specified as a list of
+              vertex indices in path order. The closing edge from the last to
+              the first vertex is implicit.
+    """
+    adjacency = {}
+    for edge_index, (vert_a, vert_b) in enumerate(edges):
+        adjacency.setdefault(vert_a, []).append(edge_index)
+        adjacency.setdefault(vert_b, []).append(edge_index)
+
+    is_used = [False] * len(edges)
+
+    for start_edge in range(len(edges)):
+        if is_used[start_edge]:
+            continue
+        is_used[start_edge] = True
+
+        first_vert, cur_vert = edges[start_edge]
+        loop = [first_vert]
+
+        while cur_vert != first_vert:
+            loop.append(cur_vert)
+
+            # Used edges are discarded lazily, each edge is popped at most
+            # twice over the whole trace.
+            candidates = adjacency[cur_vert]
+            while candidates and is_used[candidates[-1]]:
+                candidates.pop()
+
+            if not candidates:
+                raise Exception("No next edge found")
+
+            next_edge = candidates.pop()
+            is_used[next_edge] = True
+
+            vert_a, vert_b = edges[next_edge]
+            cur_vert = vert_b if vert_a == cur_vert else vert_a
+
+        yield loop
+
+
+def trace_boundary_loops(edges: list) -> list:
+    """
+    Trace the closed loops formed by the specified boundary edges.
+
+    :param edges: The boundary edges specified as (vertex index, vertex index)
+                  pairs.
+
+    :returns: A list of loops, see iter_boundary_loops.
+    """
+    return list(iter_boundary_loops(edges))
+
+
+def _iter_outlines(coordinates_2d: np.ndarray, edges: list):
+    """
+    Build the Outlines formed by the specified boundary edges, one loop at a
+    time.
+
+    :param coordinates_2d: The (N, 2) array of projected vertex coordinates
+    :param edges: The boundary edges as (vertex index, vertex index) pairs
+
+    :returns: A generator yielding an Outline per closed loop of edges.
+    """
+    index = 0
+    loops = iter_boundary_loops(edges)
+    while True:
+        with stage("trace"):
+            loop = next(loops, None)
+        if loop is None:
+            return
+        count("loops")
+        count("boundary_edges", len(loop))
+        yield Outline(coordinates_2d[loop], first_index=index)
+        index += len(loop)
+
+
+def get_boundary_edges(face_vertices: np.ndarray, face_sizes: np.ndarray) -> np.ndarray:
+    """
+    Get the edges of the specified faces which belong to a single face.
+
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+
+    :returns: The (E, 2) array of boundary edges, oriented as in their face.
+    """
+    face_vertices = np.asarray(face_vertices, dtype=np.int64)
+    face_sizes = np.asarray(face_sizes, dtype=np.int64)
+
+    # the next vertex within the same face for each face corner
+    face_starts = np.repeat(np.cumsum(face_sizes) - face_sizes, face_sizes)
+    corners = np.arange(len(face_vertices)) - face_starts
+    next_corners = face_starts + (corners + 1) % np.repeat(face_sizes, face_sizes)
+
+    starts = face_vertices
+    ends = face_vertices[next_corners]
+
+    n_verts = int(face_vertices.max()) + 1
+    keys = np.minimum(starts, ends) * n_verts + np.maximum(starts, ends)
+    _, first_corners, counts = np.unique(keys, return_index=True, return_counts=True)
+
+    boundary = np.sort(first_corners[counts == 1])
+    return np.stack((starts[boundary], ends[boundary]), axis=1)
+
+
+def get_face_normal(coordinates: np.ndarray) -> np.ndarray:
+    """
+    Calculate the normal of the face with the specified vertex coordinates
+    with Newell's method.
+
+    :param coordinates: The (K, 3) coordinates of the face vertices in order
+
+    :returns: The unit normal of the face
+    """
+    following = np.roll(coordinates, -1, axis=0)
+    normal = np.array(((coordinates[:, 1] - following[:, 1]) * (coordinates[:, 2] + following[:, 2]),
+                       (coordinates[:, 2] - following[:, 2]) * (coordinates[:, 0] + following[:, 0]),
+                       (coordinates[:, 0] - following[:, 0]) * (coordinates[:, 1] + following[:, 1]))).sum(axis=1)
+    return normal / np.linalg.norm(normal)
+
+
+def _get_ranks(values: np.ndarray, sorted_values: np.ndarray) -> np.ndarray:
+    # the index of each value within sorted_values, -1 if it is missing
+    found = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return np.where(sorted_values[found] == values, found, -1)
+
+
+def _merge_labels(n_labels: int, pairs_a: np.ndarray, pairs_b: np.ndarray) -> np.ndarray:
+    """
+    Merge the labels connected by the specified pairs by propagating the
+    smallest label over the pairs.
+
+    :returns: For each label the smallest label connected to it.
+    """
+    root = np.arange(n_labels)
+    while len(pairs_a):
+        smallest = np.minimum(root[pairs_a], root[pairs_b])
+        previous = root.copy()
+        np.minimum.at(root, pairs_a, smallest)
+        np.minimum.at(root, pairs_b, smallest)
+        root = root[root]
+        if (root == previous).all():
+            break
+    return root
+
+
+def _combine_ranks(ranks_a: np.ndarray, ranks_b: np.ndarray, size_b: int) -> np.ndarray:
+    # a single key for each pair of ranks, -1 if either of them is missing
+    return np.where((ranks_a < 0) | (ranks_b < 0), -1, ranks_a * size_b + ranks_b)
+
+
+def weld_vertices(coordinates: np.ndarray,
+                  face_vertices: np.ndarray,
+                  face_sizes: np.ndarray,
+                  tolerance: float = WELD_TOLERANCE) -> tuple:
+    """
+    Merge the vertices of the specified mesh which lie within tolerance of
+    each other, and remove the faces which collapse as a result.
+
+    The vertices are hashed onto a grid of cells of size tolerance. Vertices
+    within the same cell are merged directly, vertices in neighbouring cells
+    are merged if their representatives lie within tolerance, such that the
+    merge is linear in the number of vertices apart from the sort of the
+    cell keys.
+
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+    :param tolerance: The distance within which vertices are merged.
+
+    :returns: (coordinates, face_vertices, face_sizes) of the welded mesh,
+              unused vertices are kept such that vertex indices stay valid.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    face_vertices = np.asarray(face_vertices, dtype=np.int64)
+    face_sizes = np.asarray(face_sizes, dtype=np.int64)
+    if tolerance <= 0.0 or len(coordinates) == 0:
+        return coordinates, face_vertices, face_sizes
+
+    # merge the vertices within the same cell onto the first of them, the
+    # cells are numbered densely through the sorted unique cell indices of
+    # each axis, such that the keys of the cells fit in an int64
+    cells = np.floor(coordinates / tolerance).astype(np.int64)
+    values = [np.unique(cells[:, axis]) for axis in range(3)]
+    ranks = [np.searchsorted(values[axis], cells[:, axis]) for axis in range(3)]
+    ranks_xy = _combine_ranks(ranks[0], ranks[1], len(values[1]))
+    values_xy = np.unique(ranks_xy)
+
+    keys, first_vertices, cell_of = np.unique(_combine_ranks(np.searchsorted(values_xy, ranks_xy),
+                                                             ranks[2],
+                                                             len(values[2])),
+                                              return_index=True,
+                                              return_inverse=True)
+    cell_of = cell_of.ravel()
+    unique_cells = cells[first_vertices]
+
+    # merge neighbouring cells of which the representatives lie within
+    # tolerance, only half of the 26 neighbours need to be checked
+    neighbour_ranks = [dict((step, _get_ranks(unique_cells[:, axis] + step, values[axis]))
+                            for step in (-1, 0, 1))
+                       for axis in range(3)]
+    neighbour_ranks_xy = dict(((step_x, step_y),
+                               _get_ranks(_combine_ranks(neighbour_ranks[0][step_x],
+                                                         neighbour_ranks[1][step_y],
+                                                         len(values[1])),
+                                          values_xy))
+                              for step_x in (-1, 0, 1) for step_y in (-1, 0, 1))
+
+    pairs_a = []
+    pairs_b = []
+    for step_x, step_y, step_z in ((i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)):
+        if (step_x, step_y, step_z) <= (0, 0, 0):
+            continue
+        found = _get_ranks(_combine_ranks(neighbour_ranks_xy[(step_x, step_y)],
+                                          neighbour_ranks[2][step_z],
+                                          len(values[2])),
+                           keys)
+        cells_a = np.flatnonzero(found >= 0)
+        cells_b = found[cells_a]
+
+        steps = coordinates[first_vertices[cells_a]] - coordinates[first_vertices[cells_b]]
+        is_close = np.einsum("ij,ij->i", steps, steps) <= tolerance * tolerance
+        pairs_a.append(cells_a[is_close])
+        pairs_b.append(cells_b[is_close])
+    pairs_a = np.concatenate(pairs_a)
+    pairs_b = np.concatenate(pairs_b)
+
+    # the first vertex of each group of merged cells is kept
+    root = _merge_labels(len(keys), pairs_a, pairs_b)
+    face_vertices = first_vertices[root[cell_of[face_vertices]]]
+
+    # remove the corners which coincide with the next corner of their face
+    face_ids = np.repeat(np.arange(len(face_sizes)), face_sizes)
+    face_starts = np.repeat(np.cumsum(face_sizes) - face_sizes, face_sizes)
+    next_corners = face_starts + (np.arange(len(face_vertices)) - face_starts + 1) % np.repeat(face_sizes, face_sizes)
+    is_kept = face_vertices != face_vertices[next_corners]
+
+    face_sizes = np.bincount(face_ids[is_kept], minlength=len(face_sizes))
+    is_kept &= (face_sizes >= 3)[face_ids]
+    return coordinates, face_vertices[is_kept], face_sizes[face_sizes >= 3]
+
+
+def get_face_normals(coordinates: np.ndarray,
+                     face_vertices: np.ndarray,
+                     face_sizes: np.ndarray) -> np.ndarray:
+    """
+    Calculate the normals of all specified faces at once with Newell's method.
+
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+
+    :returns: The (F, 3) array of face normals, of which the length is twice
+              the area of each face.
+    """
+    face_starts = np.cumsum(face_sizes) - face_sizes
+    corner_starts = np.repeat(face_starts, face_sizes)
+    next_corners = corner_starts + (np.arange(len(face_vertices)) - corner_starts + 1) % np.repeat(face_sizes, face_sizes)
+
+    current = coordinates[face_vertices]
+    following = coordinates[face_vertices[next_corners]]
+    terms = np.stack(((current[:, 1] - following[:, 1]) * (current[:, 2] + following[:, 2]),
+                      (current[:, 2] - following[:, 2]) * (current[:, 0] + following[:, 0]),
+                      (current[:, 0] - following[:, 0]) * (current[:, 1] + following[:, 1])), axis=1)
+    return np.add.reduceat(terms, face_starts, axis=0)
+
+
+def get_planar_islands(coordinates: np.ndarray,
+                       face_vertices: np.ndarray,
+                       face_sizes: np.ndarray,
+                       angle_tolerance: float = ISLAND_ANGLE_TOLERANCE) -> list:
+    """
+    Split the specified mesh into planar islands, the groups of connected
+    faces of which the normals lie within angle_tolerance of each other.
+
+    The unit face normals are hashed onto a grid of cells of size
+    angle_tolerance, each cell forms a cluster. Neighbouring cells, and the
+    cells of the opposite direction, are joined if their mean normals lie
+    within half of angle_tolerance, such that a flat panel of which the
+    normals straddle a cell boundary, or of which the winding is flipped,
+    still forms a single cluster. Afterwards the faces sharing an edge within
+    the same cluster are joined. Apart from the sorts of the keys this is
+    linear in the number of faces.
+
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+    :param angle_tolerance: The maximum angle in radians between the normals
+                            of the faces of an island, approximately.
+
+    :returns: A list of (normal, face_vertices, face_sizes) of each island,
+              in which the unit normal is the area weighted normal of the
+              island.
+    """
+    normals = get_face_normals(coordinates, face_vertices, face_sizes)
+    lengths = np.linalg.norm(normals, axis=1)
+    units = normals / np.where(lengths > 0.0, lengths, 1.0)[:, None]
+
+    # hash the unit normals onto the grid, degenerate faces remain unassigned
+    cell_size = max(2.0 * math.sin(angle_tolerance / 2.0), ISLAND_MIN_CELL_SIZE)
+    radius = int(math.ceil(1.0 / cell_size)) + 2
+    base = 2 * radius + 1
+
+    def encode(cells):
+        return ((cells[:, 0] + radius) * base + cells[:, 1] + radius) * base + cells[:, 2] + radius
+
+    valid = np.flatnonzero(lengths > 0.0)
+    cells = np.round(units[valid] / cell_size).astype(np.int64)
+    keys, first_faces, cell_of = np.unique(encode(cells), return_index=True, return_inverse=True)
+    cell_of = cell_of.ravel()
+    unique_cells = cells[first_faces]
+
+    means = np.zeros((len(keys), 3))
+    np.add.at(means, cell_of, normals[valid])
+    means /= np.linalg.norm(means, axis=1)[:, None]
+
+    # join the neighbouring cells with nearly parallel mean normals, the
+    # neighbours of the opposite cell are checked for the flipped normals
+    min_cos = math.cos(angle_tolerance / 2.0)
+    pairs_a = []
+    pairs_b = []
+    for sign in (1, -1):
+        for step in ((i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)):
+            if sign == 1 and step <= (0, 0, 0):
+                continue
+            neighbours = encode(sign * unique_cells + np.array(step))
+            found = np.minimum(np.searchsorted(keys, neighbours), len(keys) - 1)
+            cells_a = np.flatnonzero(keys[found] == neighbours)
+            cells_b = found[cells_a]
+            is_close = np.abs(np.einsum("ij,ij->i", means[cells_a], means[cells_b])) >= min_cos
+            pairs_a.append(cells_a[is_close])
+            pairs_b.append(cells_b[is_close])
+    cell_roots = _merge_labels(len(keys), np.concatenate(pairs_a), np.concatenate(pairs_b))
+
+    clusters = np.full(len(face_sizes), -1)
+    clusters[valid] = cell_roots[cell_of]
+    signs = np.ones(len(face_sizes))
+    signs[valid] = np.where(np.einsum("ij,ij->i", units[valid], means[clusters[valid]]) < 0.0, -1.0, 1.0)
+
+    # join the faces sharing an edge within the same cluster
+    face_ids = np.repeat(np.arange(len(face_sizes)), face_sizes)
+    face_starts = np.repeat(np.cumsum(face_sizes) - face_sizes, face_sizes)
+    next_corners = face_starts + (np.arange(len(face_vertices)) - face_starts + 1) % np.repeat(face_sizes, face_sizes)
+    starts = face_vertices
+    ends = face_vertices[next_corners]
+
+    n_verts = int(face_vertices.max()) + 1
+    keys = np.minimum(starts, ends) * n_verts + np.maximum(starts, ends)
+    order = np.argsort(keys, kind="mergesort")
+    is_shared = keys[order[1:]] == keys[order[:-1]]
+    faces_a = face_ids[order[1:][is_shared]]
+    faces_b = face_ids[order[:-1][is_shared]]
+    is_joined = (clusters[faces_a] == clusters[faces_b]) & (clusters[faces_a] >= 0)
+    islands = _merge_labels(len(face_sizes), faces_a[is_joined], faces_b[is_joined])
+
+    # group the faces by island, keeping their order within each island
+    island_of = np.unique(islands[valid], return_inverse=True)[1].ravel()
+    island_faces = valid[np.argsort(island_of, kind="mergesort")]
+    island_counts = np.bincount(island_of)
+
+    island_normals = np.zeros((len(island_counts), 3))
+    np.add.at(island_normals, island_of, normals[valid] * signs[valid][:, None])
+    island_normals /= np.linalg.norm(island_normals, axis=1)[:, None]
+
+    sizes = face_sizes[island_faces]
+    corner_starts = np.repeat(np.cumsum(face_sizes)[island_faces] - sizes, sizes)
+    corner_offsets = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    corners = face_vertices[corner_starts + corner_offsets]
+
+    face_splits = np.cumsum(island_counts)[:-1]
+    return list(zip(island_normals,
+                    np.split(corners, np.cumsum(sizes)[face_splits - 1]),
+                    np.split(sizes, face_splits)))
+
+
+def _iter_projected_outlines(coordinates: np.ndarray,
+                             face_vertices: np.ndarray,
+                             face_sizes: np.ndarray,
+                             normal: np.ndarray):
+    # only the vertices of the faces are projected, such that projecting
+    # many islands of a large mesh stays linear
+    with stage("projection"):
+        vertices, face_vertices = np.unique(face_vertices, return_inverse=True)
+        coordinates_2d = project_coordinates(coordinates[vertices], get_quaternion_from_normal(normal))
+
+    with stage("boundary_edges"):
+        edges = get_boundary_edges(face_vertices.ravel(), face_sizes).tolist()
+    return _iter_outlines(coordinates_2d, edges)
+
+
+def _weld_mesh(coordinates: np.ndarray,
+               face_vertices: np.ndarray,
+               face_sizes: np.ndarray,
+               weld_tolerance: float) -> tuple:
+    # weld the mesh before tracing, recording the size of the mesh
+    count("vertices", len(coordinates))
+    count("faces", len(face_sizes))
+    with stage("weld"):
+        coordinates, face_vertices, face_sizes = weld_vertices(coordinates,
+                                                               face_vertices,
+                                                               face_sizes,
+                                                               weld_tolerance)
+    if len(face_sizes) <= 0:
+        raise Exception("No Data")
+    return coordinates, face_vertices, face_sizes
+
+
+def iter_outlines_from_arrays(coordinates: np.ndarray,
+                             face_vertices: np.ndarray,
+                             face_sizes: np.ndarray,
+                             weld_tolerance: float = WELD_TOLERANCE):
+    """
+    Get the outlines of the flat mesh specified by vertex and face arrays,
+    without requiring blender, yielding each outline as soon as it is traced.
+
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+    :param weld_tolerance: The distance within which vertices are merged
+                           before the outlines are traced, see weld_vertices.
+
+    :returns: A generator yielding the Outlines that correspond with the
+              outlines of the specified mesh.
+    """
+    coordinates, face_vertices, face_sizes = _weld_mesh(coordinates,
+                                                        face_vertices,
+                                                        face_sizes,
+                                                        weld_tolerance)
+
+    # determine rotation of the faces based on a normal (assuming the mesh is
+    # flat, this should not cause any problems)
+    with stage("projection"):
+        normal = get_face_normal(coordinates[face_vertices[:face_sizes[0]]])
+        coordinates_2d = project_coordinates(coordinates, get_quaternion_from_normal(normal))
+
+    with stage("boundary_edges"):
+        edges = get_boundary_edges(face_vertices, face_sizes).tolist()
+    yield from _iter_outlines(coordinates_2d, edges)
+
+
+def get_outlines_from_arrays(coordinates: np.ndarray,
+                             face_vertices: np.ndarray,
+                             face_sizes: np.ndarray,
+                             weld_tolerance: float = WELD_TOLERANCE) -> list:
+    """
+    Get the outlines of the flat mesh specified by vertex and face arrays,
+    without requiring blender.
 
-    if not fuzzy_equals(vec2d.z, height):
-        raise Exception("Height not equal")
-    return VertexInternal(index, vec2d.x, vec2d.y)
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+    :param weld_tolerance: The distance within which vertices are merged
+                           before the outlines are traced, see weld_vertices.
 
+    :returns: A list of Outlines that correspond with the outlines of the
+              specified mesh.
+    """
+    return list(iter_outlines_from_arrays(coordinates, face_vertices, face_sizes, weld_tolerance))
+
+
+def iter_island_outlines_from_arrays(coordinates: np.ndarray,
+                                    face_vertices: np.ndarray,
+                                    face_sizes: np.ndarray,
+                                    weld_tolerance: float = WELD_TOLERANCE,
+                                    angle_tolerance: float = ISLAND_ANGLE_TOLERANCE):
+    """
+    Get the outlines of each planar island of the mesh specified by vertex
+    and face arrays, such that a mesh of several flat panels at different
+    orientations, e.g. a folded assembly, can be exported at once. The
+    outlines of each island are traced as they are consumed.
+
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+    :param weld_tolerance: The distance within which vertices are merged
+                           before the outlines are traced, see weld_vertices.
+    :param angle_tolerance: The maximum angle in radians between the normals
+                            of the faces of an island, see get_planar_islands.
+
+    :returns: A generator yielding a generator of the Outlines of each
+              island, each projected along the normal of its island.
+    """
+    coordinates, face_vertices, face_sizes = _weld_mesh(coordinates,
+                                                        face_vertices,
+                                                        face_sizes,
+                                                        weld_tolerance)
+
+    with stage("islands"):
+        islands = get_planar_islands(coordinates, face_vertices, face_sizes, angle_tolerance)
+    count("islands", len(islands))
+
+    for normal, island_vertices, island_sizes in islands:
+        yield _iter_projected_outlines(coordinates, island_vertices, island_sizes, normal)
 
-def _to_vert_internal_quaternion(vertex, index, rotation_quaternion, height):
-    q_v = mathutils.Quaternion((0.0, vertex.co.x, vertex.co.y, vertex.co.z))
-    rot = rotation_quaternion * q_v * rotation_quaternion.conjugated()
-    return VertexInternal(index, rot.x, rot.y)
 
-def get_outlines(obj) -> list:
+def get_island_outlines_from_arrays(coordinates: np.ndarray,
+                                    face_vertices: np.ndarray,
+                                    face_sizes: np.ndarray,
+                                    weld_tolerance: float = WELD_TOLERANCE,
+                                    angle_tolerance: float = ISLAND_ANGLE_TOLERANCE) -> list:
+    """
+    Get the outlines of each planar island of the mesh specified by vertex
+    and face arrays, see iter_island_outlines_from_arrays.
+
+    :returns: A list with the list of Outlines of each island.
+    """
+    return list(list(outlines) for outlines in iter_island_outlines_from_arrays(coordinates,
+                                                                                face_vertices,
+                                                                                face_sizes,
+                                                                                weld_tolerance,
+                                                                                angle_tolerance))
+
+
+def get_outlines(obj, weld_tolerance: float = WELD_TOLERANCE) -> list:
     """
     Get the outlines within the specified object.
 
     :param obj: The object from which the outlines should be extracted
+    :param weld_tolerance: The distance within which vertices are merged
+                           before the outlines are traced, see weld_vertices.
 
     :returns: A list of Outlines that correspond with the outlines of the
               specified object.
     """
-    mesh = bmesh.new()
-    mesh.from_mesh(obj.data)
-    mesh.edges.index_update() # update internal indices to be correct
+    coordinates, face_vertices, face_sizes = get_mesh_arrays(obj)
+    return get_outlines_from_arrays(coordinates, face_vertices, face_sizes, weld_tolerance)
 
-    if len(mesh.faces) <= 0:
-        raise Exception("No Data")
 
-    # determine rotation of the faces based on a normal (assuming the object is
-    # flat, this should not cause any problems)
-    mesh.faces.ensure_lookup_table()
-    mesh.edges.ensure_lookup_table()
+def get_mesh_arrays(obj) -> tuple:
+    """
+    Get the raw vertex and face arrays of the specified object, which can be
+    passed to get_outlines_from_arrays outside of blender.
 
+    :param obj: The object of which the arrays should be extracted
 
-    normal_raw = mesh.faces[0].normal
-    normal = mathutils.Vector((normal_raw[0], normal_raw[1], normal_raw[2]))
-    #rotation_matrix = get_rotation_matrix_from_normal(normal)
-    #rotation_matrix = mathutils.Matrix.Identity(3)
-    q_rot = get_rotation_quaternion_from_normal(normal)
+    :returns: (coordinates, face_vertices, face_sizes), where coordinates is
+              the (N, 3) array of vertex coordinates, face_vertices the flat
+              array of the vertex indices of all faces and face_sizes the
+              number of vertices of each face.
+    """
+    mesh = obj.data
 
-    # determine relevant edges
-    relevant_edges = list(edge for edge in mesh.edges if len(edge.link_faces) == 1)
-    relevant_edge_ids = list(edge.index for edge in relevant_edges)
+    coordinates = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coordinates)
 
-    # construct separate outlines
-    result = []
+    loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+    face_sizes = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    mesh.polygons.foreach_get("loop_total", face_sizes)
 
-    height = 0.0# (rotation_matrix * relevant_edges[0].verts[0].co).z
-    index = 0
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
 
-    while relevant_edges:
-        # Construct first element of the outline
-        first_element = relevant_edges.pop()
-        first_element_id = relevant_edge_ids.pop()
-
-        # Construct first two Vertices
-        prev_vertex_internal = _to_vert_internal_quaternion(first_element.verts[0],
-                                                            index,
-                                                            q_rot,
-                                                            #rotation_matrix,
-                                                            height)
-        index += 1
-        cur_vertex_internal = _to_vert_internal_quaternion(first_element.verts[1],
-                                                           index,
-                                                           q_rot,
-                                                           #rotation_matrix,
-                                                           height)
-        index += 1
-
-        verts = [prev_vertex_internal,]
-
-        cur_vertex = first_element.verts[1]
-        while True:
-            has_finished = False
-            next_edge = None
-
-            for edge in cur_vertex.link_edges:
-                if edge.index == first_element_id:
-                    has_finished = True
-                    break
-                if edge.index in relevant_edge_ids:
-                    next_edge = edge
-                    break
+    # gather the loops of each face in face order
+    face_offsets = np.repeat(np.cumsum(face_sizes) - face_sizes, face_sizes)
+    loops = np.repeat(loop_starts, face_sizes) + np.arange(face_sizes.sum()) - face_offsets
 
-            if has_finished:
-                break
-            if not next_edge:
-                raise Exception("No next edge found")
+    return (coordinates.reshape(-1, 3).astype(np.float64),
+            loop_vertices[loops].astype(np.int64),
+            face_sizes.astype(np.int64))
 
-            if cur_vertex == next_edge.verts[0]:
-                next_vertex = next_edge.verts[1]
-            else:
-                next_vertex = next_edge.verts[0]
-
-            next_vertex_internal = _to_vert_internal_quaternion(next_vertex,
-                                                                index,
-                                                                q_rot,
-                                                                #rotation_matrix,
-                                                                height)
-            # only update index if vertex is acceppted
-
-            #angle = calculate_angle(cur_vertex_internal,
-            #                        prev_vertex_internal,
-            #                        next_vertex_internal)
-
-            if True:
-            #if not fuzzy_equals(angle, math.pi):
-                verts.append(cur_vertex_internal)
-                index += 1
-
-                prev_vertex_internal = cur_vertex_internal
-                cur_vertex_internal = next_vertex_internal
-
-            relevant_edges.remove(edge)
-            relevant_edge_ids.remove(next_edge.index)
-            cur_vertex = next_vertex
-
-        # check if current vertex internal can be added
-        #angle = calculate_angle(cur_vertex_internal,
-        #                        prev_vertex_internal,
-        #                        verts[0])
-        #if not fuzzy_equals(angle, math.pi):
-        #    verts.append(cur_vertex_internal)
-
-        # check if first vertex internal can be deleted
-        #angle = calculate_angle(verts[0],
-        #                        verts[1],
-        #                        verts[-1])
-
-        if False:
-        #if fuzzy_equals(angle, math.pi):
-            verts = verts[1:]
-
-        result.append(Outline(verts))
-    return result
 
+# ------------------------------------------------------------------------------
+# Simplify outlines
+def remove_collinear(coordinates: np.ndarray, tolerance: float = 1e-9) -> np.ndarray:
+    """
+    Remove the duplicate vertices and the vertices which lie on the straight
+    line between their neighbours of the specified closed path.
+
+    :param coordinates: The (N, 2) coordinates of the closed path.
+    :param tolerance: The maximum distance of a vertex to the line through its
+                      neighbours for it to be considered collinear.
 
-def write_obj_to_svg(outlines, padding, file_name, document_settings, unit_size, do_rotate = True):
+    :returns: The (M, 2) coordinates with M <= N of the simplified path.
     """
-    Construct an SVG drawing from the specified outline, padding and document_settings and write it
-    to file_name.
+    # drop zero length edges first, such that each vertex has two distinct
+    # neighbours
+    steps = coordinates - np.roll(coordinates, 1, axis=0)
+    is_duplicate = np.hypot(steps[:, 0], steps[:, 1]) <= tolerance
+    if is_duplicate.all():
+        return coordinates[:1]
+    coordinates = coordinates[~is_duplicate]
+
+    if len(coordinates) < 4:
+        return coordinates
+
+    to_prev = np.roll(coordinates, 1, axis=0) - coordinates
+    to_next = np.roll(coordinates, -1, axis=0) - coordinates
+    cross = to_prev[:, 0] * to_next[:, 1] - to_prev[:, 1] * to_next[:, 0]
+    dot = (to_prev * to_next).sum(axis=1)
+    span = to_next - to_prev
+    span_length = np.hypot(span[:, 0], span[:, 1])
+
+    # |cross| / span_length is the distance to the line through the
+    # neighbours, dot < 0 excludes vertices at the tip of a spike.
+    is_collinear = (np.abs(cross) <= tolerance * span_length) & (dot < 0.0)
+    return coordinates[~is_collinear]
+
+
+def douglas_peucker(coordinates: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify the specified closed path with the Douglas-Peucker algorithm.
 
-    :param outlines: The outlines of the object that should be written away.
-    :param padding: The padding in pixels that should be added. Specified as x-neg, x-pos, y-neg and y-pos.
-    :param file_name: The file name to which the svg drawing is written.
-    :param document_settings: The document settings of the svg. This should contain at least stroke, stroke-width,
-                              debug and profile.
-    :param unit_size: The unit size of each user unit in pixels.
-    :param do_rotate: If true rotate the svg drawing such that the longest edge is up.
+    :param coordinates: The (N, 2) coordinates of the closed path.
+    :param tolerance: The maximum distance between the original and the
+                      simplified path.
+
+    :returns: The (M, 2) coordinates with M <= N of the simplified path.
     """
-    # Calculate rotation
-    if do_rotate:
-        # calculate longest edge
-        longest_edge_size = 0.0
-        longest_edge = None
+    n_verts = len(coordinates)
+    if n_verts < 4:
+        return coordinates
 
-        for outline in outlines:
-            verts = outline.verts
-            for i in range(len(verts)):
-                size_edge = verts[i].distance_to(verts[i - 1])
-                if size_edge > longest_edge_size:
-                    longest_edge_size = size_edge
-                    longest_edge = (verts[i], verts[i - 1])
+    # split the closed path at the vertex furthest from the first vertex
+    offsets = coordinates - coordinates[0]
+    split = int(np.argmax(np.hypot(offsets[:, 0], offsets[:, 1])))
 
-        #TODO check the math of this
-        angle = math.acos((longest_edge[0].y - longest_edge[1].y) / longest_edge_size)
+    keep = np.zeros(n_verts, dtype=bool)
+    keep[0] = True
+    keep[split] = True
 
-        # Update all vertices
-        for outline in outlines:
-            for vert in outline.verts:
-                vert.rotate_by(angle)
+    closed = np.concatenate((coordinates, coordinates[:1]))
+    stack = [(0, split), (split, n_verts)]
 
-    # Calculate translation, padding, document size
-    min_x = +math.inf
-    min_y = +math.inf
-    max_x = -math.inf
-    max_y = -math.inf
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        start = closed[first]
+        segment = closed[last] - start
+        length = math.hypot(segment[0], segment[1])
+        offsets = closed[first + 1:last] - start
+
+        if length > 0.0:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            middle = first + 1 + i
+            keep[middle % n_verts] = True
+            stack.append((first, middle))
+            stack.append((middle, last))
+
+    return coordinates[keep]
+
+
+def visvalingam(coordinates: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify the specified closed path with the Visvalingam-Whyatt algorithm,
+    removing the vertices whose effective area is smaller than tolerance
+    squared.
+
+    :param coordinates: The (N, 2) coordinates of the closed path.
+    :param tolerance: The tolerance, the square of which is the minimum
+                      effective area of a retained vertex.
+
+    :returns: The (M, 2) coordinates with M <= N of the simplified path.
+    """
+    n_verts = len(coordinates)
+    if n_verts < 4:
+        return coordinates
+
+    points = coordinates.tolist()
+    prev_vert = [(i - 1) % n_verts for i in range(n_verts)]
+    next_vert = [(i + 1) % n_verts for i in range(n_verts)]
+
+    def area(i):
+        (ax, ay), (bx, by), (cx, cy) = points[prev_vert[i]], points[i], points[next_vert[i]]
+        return abs((bx - ax) * (cy - ay) - (cx - ax) * (by - ay)) * 0.5
+
+    min_area = tolerance * tolerance
+    areas = [area(i) for i in range(n_verts)]
+    heap = [(a, i) for i, a in enumerate(areas)]
+    heapq.heapify(heap)
+
+    is_removed = [False] * n_verts
+    n_remaining = n_verts
+
+    while heap and n_remaining > 3:
+        vert_area, i = heapq.heappop(heap)
+        if is_removed[i] or vert_area != areas[i]:
+            continue # stale entry
+        if vert_area >= min_area:
+            break
+
+        is_removed[i] = True
+        n_remaining -= 1
+        next_vert[prev_vert[i]] = next_vert[i]
+        prev_vert[next_vert[i]] = prev_vert[i]
+
+        for j in (prev_vert[i], next_vert[i]):
+            # the effective area never decreases below the removed area
+            areas[j] = max(area(j), vert_area)
+            heapq.heappush(heap, (areas[j], j))
+
+    return coordinates[~np.array(is_removed)]
+
+
+SIMPLIFY_METHODS = { "douglas-peucker": douglas_peucker
+                   , "visvalingam": visvalingam
+                   }
+
+
+def simplify_outlines(outlines, tolerance: float = 0.0,
+                      method: str = "douglas-peucker") -> list:
+    """
+    Simplify the specified outlines by removing collinear vertices, and
+    optionally the vertices that deviate less than tolerance.
+
+    :param outlines: The outlines to be simplified.
+    :param tolerance: The tolerance in the units of the outline coordinates.
+                      If 0.0 only duplicate and collinear vertices are removed.
+    :param method: The simplification used for a non-zero tolerance, either
+                   "douglas-peucker" or "visvalingam".
+
+    :returns: A list of the simplified Outlines, outlines that collapse to
+              less than three vertices are dropped.
+    """
+    simplify = SIMPLIFY_METHODS[method]
+
+    result = []
     for outline in outlines:
-        for vert in outline.verts:
-            if vert.x < min_x:
-                min_x = vert.x
-            if vert.x > max_x:
-                max_x = vert.x
-            if vert.y < min_y:
-                min_y = vert.y
-            if vert.y > max_y:
-                max_y = vert.y
+        with stage("simplify"):
+            coordinates = remove_collinear(outline.coordinates)
+            if tolerance > 0.0:
+                coordinates = simplify(coordinates, tolerance)
+        if len(coordinates) >= 3:
+            count("simplified_vertices", len(coordinates))
+            result.append(Outline(coordinates, first_index=outline.first_index))
+    return result
 
-    document_size_x = padding["x-neg"] + (max_x - min_x) * unit_size + padding["x-pos"]
-    document_size_y = padding["y-neg"] + (max_y - min_y) * unit_size + padding["y-pos"]
 
-    translation_x = padding["x-neg"] - min_x * unit_size
-    translation_y = padding["y-neg"] - min_y * unit_size
+# ------------------------------------------------------------------------------
+# Orientation and bounds of outlines
+CALIPER_BLOCK_SIZE = 256
+
+
+def get_bounds(outlines) -> tuple:
+    """
+    Calculate the axis aligned bounding box of the specified outlines.
+
+    :param outlines: The outlines of which the bounds are calculated.
 
-    # Build the svg drawing with svgwrite
-    dwg = svgwrite.Drawing(filename=file_name,
-                           size=(document_size_x, document_size_y),
-                           profile=document_settings["profile"],
-                           debug=document_settings["debug"])
+    :returns: The bounds as (min_x, min_y, max_x, max_y)
+    """
+    mins = np.array([outline.coordinates.min(axis=0) for outline in outlines if len(outline)])
+    maxs = np.array([outline.coordinates.max(axis=0) for outline in outlines if len(outline)])
+    min_x, min_y = mins.min(axis=0).tolist()
+    max_x, max_y = maxs.max(axis=0).tolist()
+    return min_x, min_y, max_x, max_y
+
+
+def get_longest_edge_angle(outlines) -> float:
+    """
+    Calculate the angle by which the outlines should be rotated such that the
+    longest edge is up.
 
-    # Construct path_cmds as specified by the SVG spec: https://www.w3.org/TR/SVG/paths.html
-    path_cmd = ""
+    :param outlines: The outlines of which the longest edge is determined.
+
+    :returns: The rotation angle in radians.
+    """
+    longest_edge_size = 0.0
+    longest_edge = None
 
     for outline in outlines:
-        verts = outline.verts
-        path_cmd += "M {}, {} ".format(verts[0].x * unit_size + translation_x,
-                                       verts[0].y * unit_size + translation_y)
+        coordinates = outline.coordinates
+        if len(coordinates) < 2:
+            continue
+        edges = coordinates - np.roll(coordinates, 1, axis=0)
+        sizes = np.hypot(edges[:, 0], edges[:, 1])
+        i = int(np.argmax(sizes))
+        if sizes[i] > longest_edge_size:
+            longest_edge_size = float(sizes[i])
+            longest_edge = edges[i]
 
-        for vert in verts[1:]:
-            path_cmd += "L {}, {} ".format(vert.x * unit_size + translation_x,
-                                           vert.y * unit_size + translation_y)
-        path_cmd += "Z "
+    #TODO check the math of this
+    return math.acos(longest_edge[1] / longest_edge_size)
 
-    path = dwg.add(dwg.path(d=path_cmd,
-                            stroke=document_settings["stroke"],
-                            stroke_width=document_settings["stroke-width"],
-                            fill=document_settings["fill"],
-                            fill_opacity=document_settings["fill-opacity"]))
 
-    # Save the drawing
-    dwg.save()
+def get_convex_hull(points: np.ndarray) -> np.ndarray:
+    """
+    Calculate the convex hull of the specified points with Andrew's monotone
+    chain algorithm.
 
+    :param points: The (N, 2) array of points.
 
-if __name__ == '__main__':
-    unit_dict = construct_unit_dict(96.0)
-    objects = get_selected_objects(only_selected=False,
-                                   with_substring="LC")
+    :returns: The (H, 2) array of hull points in counter clockwise order.
+    """
+    points = np.unique(points, axis=0) # sorted by x, then y
+    if len(points) < 3:
+        return points
+
+    def half_hull(sorted_points):
+        hull = []
+        for p in sorted_points:
+            while len(hull) >= 2:
+                (ox, oy), (ax, ay) = hull[-2], hull[-1]
+                if (ax - ox) * (p[1] - oy) - (ay - oy) * (p[0] - ox) > 0.0:
+                    break
+                hull.pop()
+            hull.append(p)
+        return hull[:-1]
 
-    for obj in objects:
-        object_outline = get_outlines(obj)
-        write_obj_to_svg(outlines=object_outline,
-                         padding={"x-neg":1.0 * unit_dict["cm"],
-                                  "x-pos":1.0 * unit_dict["cm"],
-                                  "y-neg":1.0 * unit_dict["cm"],
-                                  "y-pos":1.0 * unit_dict["cm"]},
-                         file_name="{}.svg".format(obj.name[4:]),
-                     document_settings={"profile": "tiny",
-                                        "debug": True,
-                                        "stroke": "black",
-                                        "stroke-width": 1.0,
-                                        "fill": "white",
-                                        "fill-opacity": 0.0},
-                     unit_size=unit_dict["cm"],
-                     do_rotate=False)
+    point_list = points.tolist()
+    lower = half_hull(point_list)
+    upper = half_hull(reversed(point_list))
+    return np.array(lower + upper)
+
+
+def get_minimum_area_angle(outlines) -> float:
+    """
+    Calculate the angle by which the outlines should be rotated such that
+    their axis aligned bounding box has the minimum area, using rotating
+    calipers on the convex hull. The longest side of the resulting box is
+    placed along the y-axis.
+
+    :param outlines: The outlines of which the orientation is determined.
+
+    :returns: The rotation angle in radians.
+    """
+    hull = get_convex_hull(np.concatenate([outline.coordinates for outline in outlines]))
+    if len(hull) < 3:
+        return 0.0
+
+    edges = np.roll(hull, -1, axis=0) - hull
+    edge_angles = np.arctan2(edges[:, 1], edges[:, 0])
+
+    best_area = math.inf
+    best_angle = 0.0
+    best_size = (0.0, 0.0)
+
+    # the minimum area rectangle has a side collinear with a hull edge, project
+    # the hull onto the directions of a block of edges at a time.
+    for start in range(0, len(edge_angles), CALIPER_BLOCK_SIZE):
+        angles = edge_angles[start:start + CALIPER_BLOCK_SIZE]
+        directions = np.stack((np.cos(angles), np.sin(angles)), axis=1)
+        normals = np.stack((-directions[:, 1], directions[:, 0]), axis=1)
+
+        along = np.dot(hull, directions.T)
+        across = np.dot(hull, normals.T)
+        widths = along.max(axis=0) - along.min(axis=0)
+        heights = across.max(axis=0) - across.min(axis=0)
+        areas = widths * heights
+
+        i = int(np.argmin(areas))
+        if areas[i] < best_area:
+            best_area = float(areas[i])
+            best_angle = float(angles[i])
+            best_size = (float(widths[i]), float(heights[i]))
+
+    # rotate the chosen edge onto the x-axis, and the longest side up
+    angle = -best_angle
+    if best_size[0] > best_size[1]:
+        angle += math.pi / 2.0
+    return angle
+
+
+def rotate_outlines(outlines, rotation_mode: str = "longest-edge"):
+    """
+    Rotate the specified outlines in place according to rotation_mode.
+
+    :param outlines: The outlines to rotate.
+    :param rotation_mode: Either "longest-edge", which rotates the longest edge up, or "minimum-area", which
+                          rotates the outlines such that their bounding box is minimal.
+    """
+    if rotation_mode == "minimum-area":
+        angle = get_minimum_area_angle(outlines)
+    else:
+        angle = get_longest_edge_angle(outlines)
+
+    for outline in outlines:
+        outline.rotate_by(angle)
+
+
+def arrange_outline_sets(outline_sets: list, spacing: float) -> list:
+    """
+    Arrange the specified sets of outlines next to each other along the x
+    axis, with their bottom aligned.
+
+    :param outline_sets: The lists of outlines to arrange, translated in place.
+    :param spacing: The distance between the bounds of two sets.
+
+    :returns: The outlines of all sets as a single list.
+    """
+    result = []
+    x = 0.0
+    for outlines in outline_sets:
+        min_x, min_y, max_x, _ = get_bounds(outlines)
+        for outline in outlines:
+            outline.translate_by(x - min_x, -min_y)
+        x += max_x - min_x + spacing
+        result.extend(outlines)
+    return result
+
+
+# ------------------------------------------------------------------------------
+# Fit curves to outlines
+ARC_MAX_STEP_ANGLE = math.radians(25.0)
+ARC_MAX_SPAN = math.radians(170.0)
+CURVE_MIN_STEPS = 3
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    length = math.hypot(vector[0], vector[1])
+    return vector / length if length > 0.0 else vector
+
+
+def _get_turn_angles(closed: np.ndarray) -> np.ndarray:
+    """
+    Calculate the signed turn angle at every vertex of the closed path, where
+    closed[-1] equals closed[0].
+
+    :param closed: The (N + 1, 2) coordinates of the closed path.
+
+    :returns: The (N + 1,) turn angles, positive for a turn in the positive
+              angle direction.
+    """
+    edges = np.diff(closed, axis=0)
+    incoming = np.roll(edges, 1, axis=0)
+    cross = incoming[:, 0] * edges[:, 1] - incoming[:, 1] * edges[:, 0]
+    dot = (incoming * edges).sum(axis=1)
+    turns = np.arctan2(cross, dot)
+    return np.append(turns, turns[0])
+
+
+def _fit_arc(closed: np.ndarray, first: int, last: int, tolerance: float):
+    """
+    Fit a circular arc through closed[first:last + 1].
+
+    :returns: The (radius, span) of the arc, or None if any vertex, or the
+              middle of any edge, deviates more than tolerance from it.
+    """
+    a, b, c = closed[first], closed[(first + last) // 2], closed[last]
+    d = 2.0 * (a[0] * (b[1] - c[1]) + b[0] * (c[1] - a[1]) + c[0] * (a[1] - b[1]))
+    if d == 0.0:
+        return None
+
+    sq_a, sq_b, sq_c = a.dot(a), b.dot(b), c.dot(c)
+    center = np.array(((sq_a * (b[1] - c[1]) + sq_b * (c[1] - a[1]) + sq_c * (a[1] - b[1])) / d,
+                       (sq_a * (c[0] - b[0]) + sq_b * (a[0] - c[0]) + sq_c * (b[0] - a[0])) / d))
+
+    radii = closed[first:last + 1] - center
+    distances = np.hypot(radii[:, 0], radii[:, 1])
+    radius = math.hypot(a[0] - center[0], a[1] - center[1])
+    if np.abs(distances - radius).max() > tolerance:
+        return None
+
+    cross = radii[:-1, 0] * radii[1:, 1] - radii[:-1, 1] * radii[1:, 0]
+    dot = (radii[:-1] * radii[1:]).sum(axis=1)
+    steps = np.arctan2(cross, dot)
+    span = abs(float(steps.sum()))
+    if span > ARC_MAX_SPAN:
+        return None
+
+    # the arc bulges out furthest from the vertices halfway along each edge
+    sagitta = radius * (1.0 - math.cos(float(np.abs(steps).max()) / 2.0))
+    if sagitta > tolerance:
+        return None
+    return radius, span
+
+
+def _fit_cubic(closed: np.ndarray, first: int, last: int, tolerance: float,
+               tangent_first: np.ndarray, tangent_last: np.ndarray):
+    """
+    Fit a cubic Bezier through closed[first:last + 1] with fixed end points
+    and end tangents, solving for the tangent lengths in the least squares
+    sense with a chord length parametrisation.
+
+    :returns: The two control points, or None if any vertex, or the middle of
+              any chord, deviates more than tolerance from the curve.
+    """
+    points = closed[first:last + 1]
+    start, end = points[0], points[-1]
+
+    chords = np.hypot(*np.diff(points, axis=0).T)
+    u = np.concatenate(((0.0,), np.cumsum(chords)))
+    if u[-1] <= 0.0:
+        return None
+    u = (u / u[-1])[:, None]
+
+    b0 = (1.0 - u) ** 3
+    b1 = 3.0 * u * (1.0 - u) ** 2
+    b2 = 3.0 * u * u * (1.0 - u)
+    b3 = u ** 3
+
+    a1 = b1 * tangent_first
+    a2 = b2 * tangent_last
+    rest = points - (b0 + b1) * start - (b2 + b3) * end
+
+    c11, c12, c22 = (a1 * a1).sum(), (a1 * a2).sum(), (a2 * a2).sum()
+    x1, x2 = (a1 * rest).sum(), (a2 * rest).sum()
+    det = c11 * c22 - c12 * c12
+
+    chord = math.hypot(end[0] - start[0], end[1] - start[1])
+    alpha_1 = alpha_2 = chord / 3.0
+    if abs(det) > 1e-12:
+        alpha_1 = (x1 * c22 - x2 * c12) / det
+        alpha_2 = (c11 * x2 - c12 * x1) / det
+        if alpha_1 <= 0.0 or alpha_2 <= 0.0:
+            alpha_1 = alpha_2 = chord / 3.0
+
+    control_a = start + alpha_1 * tangent_first
+    control_b = end + alpha_2 * tangent_last
+    curve = b0 * start + b1 * control_a + b2 * control_b + b3 * end
+    errors = np.hypot(*(curve - points).T)
+    if errors.max() > tolerance:
+        return None
+
+    # the curve may bulge out between the vertices, so also measure it
+    # halfway along each chord
+    v = (u[:-1] + u[1:]) / 2.0
+    middle = ((1.0 - v) ** 3 * start + 3.0 * v * (1.0 - v) ** 2 * control_a +
+              3.0 * v * v * (1.0 - v) * control_b + v ** 3 * end)
+    errors = np.hypot(*(middle - (points[:-1] + points[1:]) / 2.0).T)
+    if errors.max() > tolerance:
+        return None
+    return control_a, control_b
+
+
+def _longest_fit(first: int, max_last: int, fit):
+    """
+    Find the longest run first..last, with last <= max_last, for which fit
+    succeeds, growing the run exponentially and then bisecting.
+
+    :returns: The (last, fit result) of the longest run, or (None, None).
+    """
+    best = (None, None)
+    if max_last - first < CURVE_MIN_STEPS:
+        return best
+
+    low = first
+    steps = CURVE_MIN_STEPS
+    while True:
+        last = min(first + steps, max_last)
+        result = fit(last)
+        if result is None:
+            high = last
+            break
+        best = (last, result)
+        low = last
+        if last == max_last:
+            return best
+        steps *= 2
+
+    if best[0] is None:
+        return best
+
+    while high - low > 1:
+        middle = (low + high) // 2
+        result = fit(middle)
+        if result is None:
+            high = middle
+        else:
+            best = (middle, result)
+            low = middle
+    return best
+
+
+def fit_curves(points: np.ndarray, tolerance: float, fit_beziers: bool = False) -> list:
+    """
+    Fit circular arcs, and optionally cubic Beziers, to runs of the vertices
+    of the specified closed path.
+
+    Only runs of at least CURVE_MIN_STEPS edges, without turns sharper than
+    ARC_MAX_STEP_ANGLE, are replaced, such that genuine corners and polygons
+    are kept as line segments.
+
+    :param points: The (N, 2) coordinates of the closed path.
+    :param tolerance: The maximum distance of a vertex to the fitted curve.
+    :param fit_beziers: If True fit cubic Beziers to smooth runs which do not
+                        lie on a circular arc.
+
+    :returns: A list of segments, each either ("L", end), ("A", end, radius,
+              large_arc, sweep) or ("C", end, control_a, control_b), where end
+              indexes points, with N referring back to the first vertex.
+    """
+    n_verts = len(points)
+    closed = np.concatenate((points, points[:1]))
+    turns = _get_turn_angles(closed)
+    is_smooth = np.abs(turns) <= ARC_MAX_STEP_ANGLE
+
+    # the last vertex at which a smooth run starting at i can end
+    run_end = np.empty(n_verts + 1, dtype=np.int64)
+    run_end[n_verts] = n_verts
+    for i in range(n_verts - 1, -1, -1):
+        run_end[i] = run_end[i + 1] if is_smooth[i + 1] and i + 1 < n_verts else i + 1
+
+    segments = []
+    i = 0
+    while i < n_verts:
+        max_last = int(run_end[i])
+        # the arc must keep turning in the same direction
+        signs = np.sign(turns[i + 1:max_last])
+        if len(signs) > 0 and (signs != signs[0]).any():
+            arc_last = i + 1 + int(np.argmax(signs != signs[0]))
+        else:
+            arc_last = max_last
+
+        last, arc = _longest_fit(i, arc_last,
+                                 lambda j: _fit_arc(closed, i, j, tolerance))
+
+        if fit_beziers and max_last - i >= CURVE_MIN_STEPS and (last is None or last < max_last):
+            # use the central tangent at smooth end points to keep the path
+            # smooth across segments
+            prev_vert = i - 1 if i > 0 else n_verts - 1
+            tangent_first = _unit(closed[i + 1] - (closed[prev_vert] if is_smooth[i] else closed[i]))
+
+            def fit_cubic(j):
+                next_vert = j + 1 if j < n_verts else 1
+                tangent_last = _unit(closed[j - 1] - (closed[next_vert] if is_smooth[j] else closed[j]))
+                return _fit_cubic(closed, i, j, tolerance, tangent_first, tangent_last)
+
+            cubic_last, cubic = _longest_fit(i, max_last, fit_cubic)
+            if cubic_last is not None and (last is None or cubic_last > last):
+                segments.append(("C", cubic_last, cubic[0], cubic[1]))
+                i = cubic_last
+                continue
+
+        if last is not None:
+            radius, span = arc
+            segments.append(("A", last, radius, int(span > math.pi), int(turns[i + 1] > 0.0)))
+            i = last
+        else:
+            segments.append(("L", i + 1))
+            i += 1
+    return segments
+
+
+# ------------------------------------------------------------------------------
+# Write outlines to svg
+PATH_CHUNK_SIZE = 4096
+
+
+def _format_coordinates(values: np.ndarray, precision) -> str:
+    """
+    Format the specified coordinate values as a comma separated string.
+
+    :param values: The (N, 2) array of values to be formatted.
+    :param precision: The number of decimals to round to, or None to write
+                      the values at full precision.
+
+    :returns: The values formatted as "x,y,x,y,..."
+    """
+    if precision is not None:
+        values = np.round(values, precision) + 0.0 # + 0.0 removes negative zeros
+    text = ",".join(map(str, values.ravel().tolist()))
+    # str of a float only produces trailing zeros as ".0"
+    return (text + ",").replace(".0,", ",")[:-1]
+
+
+def _iter_fitted_path_data(points: np.ndarray, segments: list, precision, relative: bool):
+    """
+    Generate the path data of a single closed path of which the segments
+    have been fitted with fit_curves.
+
+    :param points: The (N, 2) coordinates of the closed path in pixels.
+    :param segments: The segments as returned by fit_curves.
+    :param precision: The number of decimals of each coordinate, or None.
+    :param relative: If True, write relative commands.
+
+    :returns: A generator yielding the path data as strings.
+    """
+    def rounded(values):
+        return values if precision is None else np.round(values, precision)
+
+    closed = rounded(np.concatenate((points, points[:1])))
+    yield "M{}".format(_format_coordinates(closed[:1], precision))
+
+    # the final line back to the first vertex is written by Z
+    if segments and segments[-1][0] == "L":
+        segments = segments[:-1]
+
+    cur = 0
+    line_ends = []
+    for segment in segments + [("Z",)]:
+        if segment[0] == "L":
+            line_ends.append(segment[1])
+            continue
+
+        if line_ends:
+            ends = closed[line_ends]
+            if relative:
+                ends = np.diff(closed[[cur] + line_ends], axis=0)
+            yield "{}{}".format("l" if relative else "L", _format_coordinates(ends, precision))
+            cur = line_ends[-1]
+            line_ends = []
+
+        origin = closed[cur] if relative else 0.0
+
+        if segment[0] == "A":
+            _, end, radius, large_arc, sweep = segment
+            radius = _format_coordinates(rounded(np.array((radius,))), precision)
+            yield "{}{},{},0,{},{},{}".format("a" if relative else "A",
+                                              radius, radius, large_arc, sweep,
+                                              _format_coordinates(closed[end] - origin, precision))
+            cur = end
+        elif segment[0] == "C":
+            _, end, control_a, control_b = segment
+            values = np.stack((rounded(control_a), rounded(control_b), closed[end])) - origin
+            yield "{}{}".format("c" if relative else "C", _format_coordinates(values, precision))
+            cur = end
+    yield "Z"
+
+
+def iter_path_data(outlines, unit_size: float, translation: tuple,
+                   precision=None, relative: bool = False,
+                   chunk_size: int = PATH_CHUNK_SIZE,
+                   curve_tolerance=None, fit_beziers: bool = False):
+    """
+    Generate the path data of the specified outlines, as specified by the SVG
+    spec: https://www.w3.org/TR/SVG/paths.html, in chunks.
+
+    :param outlines: The outlines to be converted to path data, open outlines
+                     are written as lines without closing them.
+    :param unit_size: The unit size of each user unit in pixels.
+    :param translation: The (x, y) translation in pixels applied after scaling.
+    :param precision: The number of decimals of each coordinate, or None to
+                      write coordinates at full precision.
+    :param relative: If True, write all but the first vertex of each outline
+                     as a relative lineto, which shortens the path data.
+    :param chunk_size: The maximum number of vertices formatted per chunk.
+    :param curve_tolerance: The tolerance in pixels within which arcs, and
+                            optionally cubic Beziers, are fitted to the
+                            outlines, or None to write line segments only.
+    :param fit_beziers: If True also fit cubic Beziers, see fit_curves.
+
+    :returns: A generator yielding the path data as strings.
+    """
+    for outline in outlines:
+        if len(outline) == 0:
+            continue
+        points = outline.coordinates * unit_size + translation
+
+        if curve_tolerance is not None and outline.is_closed:
+            yield from _iter_fitted_path_data(points,
+                                              fit_curves(points, curve_tolerance, fit_beziers),
+                                              precision,
+                                              relative)
+            continue
+
+        if relative:
+            if precision is not None:
+                points = np.round(points, precision)
+            steps = np.diff(points, axis=0)
+            yield "M{}".format(_format_coordinates(points[:1], precision))
+            command = "l"
+        else:
+            steps = points[1:]
+            yield "M{}".format(_format_coordinates(points[:1], precision))
+            command = "L"
+
+        for start in range(0, len(steps), chunk_size):
+            yield "{}{}".format(command,
+                                _format_coordinates(steps[start:start + chunk_size], precision))
+        if outline.is_closed:
+            yield "Z"
+
+
+def _write_svg_stream(file_name: str, path_data, size: tuple, document_settings: dict, mark_data=None):
+    """
+    Write the svg document containing the specified path data directly to
+    file_name, without building the document in memory.
+
+    :param file_name: The file name to which the svg document is written.
+    :param path_data: An iterable of path data chunks.
+    :param size: The (width, height) of the document in pixels.
+    :param document_settings: The document settings of the svg.
+    :param mark_data: An optional iterable of path data chunks of marks, which
+                      are written as a separate path with the mark-stroke of
+                      document_settings, red by default.
+    """
+    profile = document_settings["profile"]
+    with open(file_name, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8" ?>\n')
+        f.write('<svg baseProfile={} height="{}" version="{}" width="{}" '
+                'xmlns="http://www.w3.org/2000/svg" '
+                'xmlns:ev="http://www.w3.org/2001/xml-events" '
+                'xmlns:xlink="http://www.w3.org/1999/xlink"><defs />'.format(
+                    quoteattr(profile),
+                    size[1],
+                    "1.2" if profile == "tiny" else "1.1",
+                    size[0]))
+        f.write('<path d="')
+        for chunk in path_data:
+            f.write(chunk)
+        f.write('" fill={} fill-opacity="{}" stroke={} stroke-width="{}" />'.format(
+            quoteattr(str(document_settings["fill"])),
+            document_settings["fill-opacity"],
+            quoteattr(str(document_settings["stroke"])),
+            document_settings["stroke-width"]))
+        if mark_data is not None:
+            f.write('<path d="')
+            for chunk in mark_data:
+                f.write(chunk)
+            f.write('" fill="none" stroke={} stroke-width="{}" />'.format(
+                quoteattr(str(document_settings.get("mark-stroke", "red"))),
+                document_settings["stroke-width"]))
+        f.write('</svg>')
+        count("bytes_written", f.tell())
+
+
+def write_outlines_to_svg(outlines, file_name: str, size: tuple, translation: tuple,
+                          unit_size: float, document_settings: dict):
+    """
+    Write the specified outlines as a single path to an svg document of the
+    specified size.
+
+    :param outlines: The outlines to be written.
+    :param file_name: The file name to which the svg drawing is written.
+    :param size: The (width, height) of the document in pixels.
+    :param translation: The (x, y) translation in pixels applied after scaling.
+    :param unit_size: The unit size of each user unit in pixels.
+    :param document_settings: The document settings of the svg, see
+                              write_obj_to_svg.
+    """
+    curve_tolerance = document_settings.get("curve-tolerance", None)
+    if curve_tolerance is not None:
+        curve_tolerance *= unit_size
+
+    path_data = iter_path_data(outlines,
+                               unit_size,
+                               translation,
+                               precision=document_settings.get("precision", None),
+                               relative=document_settings.get("relative", False),
+                               curve_tolerance=curve_tolerance,
+                               fit_beziers=document_settings.get("fit-beziers", False))
+
+    if not document_settings["debug"]:
+        with stage("write"):
+            _write_svg_stream(file_name, path_data, size, document_settings)
+        return
+
+    # Build and validate the svg drawing with svgwrite
+    with stage("write"):
+        dwg = svgwrite.Drawing(filename=file_name,
+                               size=size,
+                               profile=document_settings["profile"],
+                               debug=document_settings["debug"])
+
+        path = dwg.add(dwg.path(d="".join(path_data),
+                                stroke=document_settings["stroke"],
+                                stroke_width=document_settings["stroke-width"],
+                                fill=document_settings["fill"],
+                                fill_opacity=document_settings["fill-opacity"]))
+
+        # Save the drawing
+        dwg.save()
+    count("bytes_written", os.path.getsize(file_name))
+
+
+def write_obj_to_svg(outlines, padding, file_name, document_settings, unit_size, do_rotate = True,
+                     rotation_mode = "longest-edge", do_order_cuts = False, parents = None):
+    """
+    Construct an SVG drawing from the specified outline, padding and document_settings and write it
+    to file_name.
+
+    :param outlines: The outlines of the object that should be written away.
+    :param padding: The padding in pixels that should be added. Specified as x-neg, x-pos, y-neg and y-pos.
+    :param file_name: The file name to which the svg drawing is written.
+    :param document_settings: The document settings of the svg. This should contain at least stroke, stroke-width,
+                              fill, fill-opacity, debug and profile. If debug is True the drawing is built and
+                              validated with svgwrite, otherwise it is streamed directly to file_name. Optionally
+                              precision (decimals per coordinate), relative (use relative commands),
+                              curve-tolerance (fit arcs within this tolerance in user units) and fit-beziers (also
+                              fit cubic Beziers) can be specified.
+    :param unit_size: The unit size of each user unit in pixels.
+    :param do_rotate: If true rotate the svg drawing according to rotation_mode.
+    :param rotation_mode: Either "longest-edge", which rotates the longest edge up, or "minimum-area", which
+                          rotates the drawing such that its bounding box, and thus the used sheet area, is minimal.
+    :param do_order_cuts: If true order the outlines to reduce the travel of the laser head, see order_cuts.
+    :param parents: The enclosing outlines as returned by get_containing_outlines, used to order the cuts.
+                    Calculated if None.
+    """
+    # Calculate rotation
+    if do_rotate:
+        with stage("rotate"):
+            rotate_outlines(outlines, rotation_mode)
+
+    # Calculate translation, padding, document size
+    min_x, min_y, max_x, max_y = get_bounds(outlines)
+
+    if do_order_cuts:
+        with stage("order"):
+            outlines = order_cuts(outlines, start=(min_x, min_y), parents=parents)
+
+    document_size_x = padding["x-neg"] + (max_x - min_x) * unit_size + padding["x-pos"]
+    document_size_y = padding["y-neg"] + (max_y - min_y) * unit_size + padding["y-pos"]
+
+    translation_x = padding["x-neg"] - min_x * unit_size
+    translation_y = padding["y-neg"] - min_y * unit_size
+
+    write_outlines_to_svg(outlines,
+                          file_name,
+                          (document_size_x, document_size_y),
+                          (translation_x, translation_y),
+                          unit_size,
+                          document_settings)
+
+
+# ------------------------------------------------------------------------------
+# Spatial index
+class GridIndex(object):
+    """
+    The GridIndex is a uniform grid spatial index over axis aligned bounding
+    boxes, used to find the items that possibly overlap a query box.
+    """
+    def __init__(self, cell_size: float):
+        """
+        Construct a new empty GridIndex with the specified cell size.
+
+        :param cell_size: The width and height of each grid cell.
+        """
+        self._cell_size = cell_size
+        self._cells = {}
+        self._bounds = {}
+
+    def _cell_range(self, bounds: tuple):
+        min_x, min_y, max_x, max_y = bounds
+        size = self._cell_size
+        for i in range(int(math.floor(min_x / size)), int(math.floor(max_x / size)) + 1):
+            for j in range(int(math.floor(min_y / size)), int(math.floor(max_y / size)) + 1):
+                yield (i, j)
+
+    def insert(self, item, bounds: tuple):
+        """
+        Insert item with the specified bounds.
+
+        :param item: The hashable item to insert.
+        :param bounds: The (min_x, min_y, max_x, max_y) bounds of item.
+        """
+        self._bounds[item] = bounds
+        for cell in self._cell_range(bounds):
+            self._cells.setdefault(cell, set()).add(item)
+
+    def remove(self, item):
+        """
+        Remove item from this GridIndex.
+
+        :param item: The item to remove.
+        """
+        for cell in self._cell_range(self._bounds.pop(item)):
+            self._cells[cell].discard(item)
+
+    def query(self, bounds: tuple) -> set:
+        """
+        Get the items of which the bounds overlap the specified bounds.
+
+        :param bounds: The (min_x, min_y, max_x, max_y) query bounds.
+
+        :returns: The set of overlapping items.
+        """
+        min_x, min_y, max_x, max_y = bounds
+        result = set()
+        for cell in self._cell_range(bounds):
+            for item in self._cells.get(cell, ()):
+                if item in result:
+                    continue
+                o_min_x, o_min_y, o_max_x, o_max_y = self._bounds[item]
+                if o_min_x <= max_x and min_x <= o_max_x and o_min_y <= max_y and min_y <= o_max_y:
+                    result.add(item)
+        return result
+
+
+class KDTree(object):
+    """
+    The KDTree is a static two dimensional k-d tree over a set of points,
+    in which points can be disabled and enabled again, used for nearest
+    neighbour queries over the points that are still available.
+    """
+    LEAF_SIZE = 16
+
+    def __init__(self, points: np.ndarray, is_enabled: bool = True):
+        """
+        Construct a new KDTree over the specified points.
+
+        :param points: The (N, 2) array of points.
+        :param is_enabled: Whether all points are initially enabled.
+        """
+        self._points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self._is_enabled = [is_enabled] * len(self._points)
+
+        # nodes are [axis, split, left, right, enabled count, parent, indices]
+        self._nodes = []
+        self._leaf_of = [0] * len(self._points)
+        if len(self._points):
+            self._build(np.arange(len(self._points)), -1, is_enabled)
+
+    def _build(self, indices: np.ndarray, parent: int, is_enabled: bool) -> int:
+        node = len(self._nodes)
+        count = len(indices) if is_enabled else 0
+        if len(indices) <= self.LEAF_SIZE:
+            self._nodes.append([None, None, None, None, count, parent, indices.tolist()])
+            for i in indices.tolist():
+                self._leaf_of[i] = node
+            return node
+
+        extent = np.ptp(self._points[indices], axis=0)
+        axis = int(np.argmax(extent))
+        order = indices[np.argsort(self._points[indices, axis], kind="mergesort")]
+        middle = len(order) // 2
+        split = float(self._points[order[middle], axis])
+
+        self._nodes.append([axis, split, None, None, count, parent, None])
+        self._nodes[node][2] = self._build(order[:middle], node, is_enabled)
+        self._nodes[node][3] = self._build(order[middle:], node, is_enabled)
+        return node
+
+    def set_enabled(self, i: int, is_enabled: bool):
+        """
+        Enable or disable point i.
+
+        :param i: The index of the point.
+        :param is_enabled: Whether point i can be returned by nearest.
+        """
+        if self._is_enabled[i] == is_enabled:
+            return
+        self._is_enabled[i] = is_enabled
+        change = 1 if is_enabled else -1
+        node = self._leaf_of[i]
+        while node != -1:
+            self._nodes[node][4] += change
+            node = self._nodes[node][5]
+
+    def nearest(self, point) -> int:
+        """
+        Find the enabled point nearest to the specified point.
+
+        :param point: The (x, y) query point.
+
+        :returns: The index of the nearest enabled point, or None if no point
+                  is enabled.
+        """
+        result = self.query(point, 1)
+        return result[0] if result else None
+
+    def query(self, point, k: int) -> list:
+        """
+        Find the k enabled points nearest to the specified point.
+
+        :param point: The (x, y) query point.
+        :param k: The number of points to find.
+
+        :returns: The indices of the nearest enabled points, nearest first.
+        """
+        if not self._nodes or self._nodes[0][4] == 0:
+            return []
+
+        x, y = float(point[0]), float(point[1])
+        points = self._points
+        best = [] # max heap of (-distance squared, index)
+
+        def bound():
+            return -best[0][0] if len(best) == k else math.inf
+
+        stack = [(0, 0.0)]
+        while stack:
+            node, distance_sq = stack.pop()
+            if distance_sq > bound():
+                continue
+            axis, split, left, right, count, _, indices = self._nodes[node]
+            if count == 0:
+                continue
+
+            if indices is not None:
+                for i in indices:
+                    if not self._is_enabled[i]:
+                        continue
+                    d_x = points[i, 0] - x
+                    d_y = points[i, 1] - y
+                    d_sq = d_x * d_x + d_y * d_y
+                    if len(best) < k:
+                        heapq.heappush(best, (-d_sq, i))
+                    elif d_sq < -best[0][0]:
+                        heapq.heapreplace(best, (-d_sq, i))
+                continue
+
+            offset = (x if axis == 0 else y) - split
+            near, far = (left, right) if offset < 0.0 else (right, left)
+            # the far side is pushed first, such that near is searched first
+            stack.append((far, offset * offset))
+            stack.append((near, distance_sq))
+
+        return [i for _, i in sorted(best, reverse=True)]
+
+
+class BoundsTree(object):
+    """
+    The BoundsTree is a static R-tree over axis aligned bounding boxes, packed
+    with the sort-tile-recursive method, used to find the boxes that overlap
+    or contain a query box.
+    """
+    NODE_SIZE = 16
+
+    def __init__(self, bounds: np.ndarray):
+        """
+        Construct a new BoundsTree over the specified bounds.
+
+        :param bounds: The (N, 4) array of (min_x, min_y, max_x, max_y) bounds.
+        """
+        bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        size = self.NODE_SIZE
+
+        # sort the boxes into tiles of vertical slices sorted along y
+        n_boxes = len(bounds)
+        n_slices = max(int(math.ceil(math.sqrt(n_boxes / size))), 1)
+        centers = bounds[:, :2] + bounds[:, 2:]
+        order = np.argsort(centers[:, 0], kind="mergesort")
+        slice_size = n_slices * size
+        tiles = [order[k:k + slice_size] for k in range(0, n_boxes, slice_size)]
+        if tiles:
+            order = np.concatenate([tile[np.argsort(centers[tile, 1], kind="mergesort")] for tile in tiles])
+
+        # each level holds the bounds of its nodes, the children of node k on
+        # level i are nodes [k * size, (k + 1) * size) of level i - 1
+        self._items = order
+        self._levels = [bounds[order]]
+        while len(self._levels[-1]) > size:
+            level = self._levels[-1]
+            n_nodes = (len(level) + size - 1) // size
+            padded = np.full((n_nodes * size, 4), np.nan)
+            padded[:len(level)] = level
+            padded = padded.reshape(n_nodes, size, 4)
+            self._levels.append(np.concatenate([np.nanmin(padded[:, :, :2], axis=1),
+                                                np.nanmax(padded[:, :, 2:], axis=1)], axis=1))
+
+    def _query(self, bounds: tuple, is_containing: bool) -> list:
+        min_x, min_y, max_x, max_y = bounds
+        size = self.NODE_SIZE
+        result = []
+
+        stack = [(len(self._levels) - 1, 0, len(self._levels[-1]))]
+        while stack:
+            level, first, last = stack.pop()
+            boxes = self._levels[level][first:last]
+            if is_containing:
+                # a node can only hold a containing box if it contains bounds
+                mask = ((boxes[:, 0] <= min_x) & (boxes[:, 1] <= min_y) &
+                        (boxes[:, 2] >= max_x) & (boxes[:, 3] >= max_y))
+            else:
+                mask = ((boxes[:, 0] <= max_x) & (boxes[:, 1] <= max_y) &
+                        (boxes[:, 2] >= min_x) & (boxes[:, 3] >= min_y))
+
+            hits = np.flatnonzero(mask) + first
+            if level == 0:
+                result.extend(self._items[hits].tolist())
+                continue
+            n_children = len(self._levels[level - 1])
+            for k in hits.tolist():
+                stack.append((level - 1, k * size, min((k + 1) * size, n_children)))
+        return result
+
+    def query(self, bounds: tuple) -> list:
+        """
+        Get the indices of the boxes which overlap the specified bounds.
+
+        :param bounds: The (min_x, min_y, max_x, max_y) query bounds.
+
+        :returns: The list of indices of the overlapping boxes.
+        """
+        return self._query(bounds, False)
+
+    def query_containing(self, bounds: tuple) -> list:
+        """
+        Get the indices of the boxes which contain the specified bounds.
+
+        :param bounds: The (min_x, min_y, max_x, max_y) query bounds.
+
+        :returns: The list of indices of the containing boxes.
+        """
+        return self._query(bounds, True)
+
+
+# ------------------------------------------------------------------------------
+# Containment of outlines
+OUTLINE_OUTER = "outer"
+OUTLINE_HOLE = "hole"
+OUTLINE_ISLAND = "island"
+
+
+def get_containing_outlines(outlines) -> list:
+    """
+    Determine for each outline the smallest outline which encloses it.
+
+    Candidate outlines are those of which the bounding box contains the
+    bounding box of the outline and that have a larger area, found with a
+    BoundsTree. The candidates are then tested with a point in polygon test,
+    grouped per candidate such that each candidate is tested once.
+
+    :param outlines: The outlines to classify.
+
+    :returns: For each outline the index of its smallest enclosing outline, or
+              None if it is not enclosed.
+    """
+    if not outlines:
+        return []
+
+    bounds = np.array([np.concatenate([outline.coordinates.min(axis=0), outline.coordinates.max(axis=0)])
+                       for outline in outlines])
+    areas = [abs(get_signed_area(outline.coordinates)) for outline in outlines]
+    tree = BoundsTree(bounds)
+
+    candidates = {}
+    for i in range(len(outlines)):
+        for j in tree.query_containing(bounds[i]):
+            if j != i and areas[j] > areas[i]:
+                candidates.setdefault(j, []).append(i)
+
+    parents = [None] * len(outlines)
+    for j, children in candidates.items():
+        points = np.array([outlines[i].coordinates[0] for i in children])
+        for i, is_inside in zip(children, points_in_polygon(points, outlines[j].coordinates)):
+            if is_inside and (parents[i] is None or areas[j] < areas[parents[i]]):
+                parents[i] = j
+    return parents
+
+
+def classify_outlines(outlines, parents: list = None) -> list:
+    """
+    Classify each outline as the outer boundary of a part, a hole within a
+    part or an island within a hole, by its depth in the containment
+    hierarchy.
+
+    :param outlines: The outlines to classify.
+    :param parents: The enclosing outlines as returned by
+                    get_containing_outlines, calculated if None.
+
+    :returns: For each outline either OUTLINE_OUTER, OUTLINE_HOLE or
+              OUTLINE_ISLAND.
+    """
+    if parents is None:
+        parents = get_containing_outlines(outlines)
+
+    depths = [None] * len(outlines)
+    for i in range(len(outlines)):
+        chain = []
+        j = i
+        while j is not None and depths[j] is None:
+            chain.append(j)
+            j = parents[j]
+        depth = -1 if j is None else depths[j]
+        for k in reversed(chain):
+            depth += 1
+            depths[k] = depth
+
+    return [OUTLINE_OUTER if depth == 0 else OUTLINE_HOLE if depth % 2 else OUTLINE_ISLAND
+            for depth in depths]
+
+
+def orient_outlines(outlines, kinds: list = None) -> list:
+    """
+    Orient the outlines such that outer boundaries and islands are counter
+    clockwise and holes are clockwise, such that the drawing is filled
+    correctly with either the nonzero or the evenodd fill rule.
+
+    :param outlines: The outlines to orient.
+    :param kinds: The classification as returned by classify_outlines,
+                  calculated if None.
+
+    :returns: A new list of the oriented outlines.
+    """
+    if kinds is None:
+        kinds = classify_outlines(outlines)
+
+    result = []
+    for outline, kind in zip(outlines, kinds):
+        is_clockwise = get_signed_area(outline.coordinates) < 0.0
+        if is_clockwise != (kind == OUTLINE_HOLE):
+            # reverse the direction, keeping the first vertex
+            outline = Outline(np.roll(outline.coordinates[::-1], 1, axis=0), outline.first_index)
+        result.append(outline)
+    return result
+
+
+# ------------------------------------------------------------------------------
+# Cut order
+CUT_ORDER_NEIGHBOURS = 8
+CUT_ORDER_MAX_PASSES = 16
+
+
+def _travel(a, b) -> float:
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def order_cuts(outlines, start: tuple = None, parents: list = None) -> list:
+    """
+    Order the specified outlines to reduce the travel of the laser head, while
+    cutting every outline before the outline that encloses it.
+
+    A nearest neighbour tour over the available outlines, using a KDTree over
+    their start points, is improved with 2-opt moves over the nearest
+    neighbours of each outline. Finally the start vertex of every outline is
+    moved to the vertex nearest to the end of the previous cut.
+
+    :param outlines: The outlines to order.
+    :param start: The (x, y) start position of the laser head, defaults to the
+                  minimum of the bounds of outlines.
+    :param parents: The enclosing outlines as returned by
+                    get_containing_outlines, calculated if None.
+
+    :returns: A new list of the ordered outlines.
+    """
+    n_outlines = len(outlines)
+    if n_outlines < 2:
+        return list(outlines)
+
+    if start is None:
+        start = get_bounds(outlines)[:2]
+
+    if parents is None:
+        parents = get_containing_outlines(outlines)
+    n_children = [0] * n_outlines
+    for parent in parents:
+        if parent is not None:
+            n_children[parent] += 1
+
+    points = np.array([outline.coordinates[0] for outline in outlines])
+    tree = KDTree(points, is_enabled=False)
+    for i in range(n_outlines):
+        if n_children[i] == 0:
+            tree.set_enabled(i, True)
+
+    # nearest neighbour tour over the outlines of which all enclosed outlines
+    # have been cut
+    tour = []
+    position = start
+    for _ in range(n_outlines):
+        i = tree.nearest(position)
+        tree.set_enabled(i, False)
+        tour.append(i)
+        position = points[i]
+
+        parent = parents[i]
+        if parent is not None:
+            n_children[parent] -= 1
+            if n_children[parent] == 0:
+                tree.set_enabled(parent, True)
+
+    # improve the tour between the entry vertices of the cuts, which move
+    # once the order changes, hence the entry vertices are picked again
+    firsts = _get_first_vertices(outlines, tour, start)
+    points = np.array([outlines[i].coordinates[firsts[i]] for i in range(n_outlines)])
+    tour = _two_opt(tour, points, start, parents)
+    firsts = _get_first_vertices(outlines, tour, start)
+
+    return [Outline(np.roll(outlines[i].coordinates, -firsts[i], axis=0), outlines[i].first_index)
+            for i in tour]
+
+
+def _get_first_vertices(outlines, tour: list, start: tuple) -> list:
+    """
+    Get for each outline the index of its vertex nearest to the end of the
+    previous cut in tour, at which its cut should start.
+    """
+    firsts = [0] * len(outlines)
+    position = np.asarray(start, dtype=np.float64)
+    for i in tour:
+        coordinates = outlines[i].coordinates
+        offsets = coordinates - position
+        firsts[i] = int(np.argmin((offsets * offsets).sum(axis=1)))
+        position = coordinates[firsts[i]]
+    return firsts
+
+
+def _two_opt(tour: list, points: np.ndarray, start: tuple, parents: list) -> list:
+    """
+    Improve the open tour starting at start with 2-opt moves, only
+    considering reconnections to the nearest neighbours of each point and
+    rejecting moves that would cut an outline after its enclosing outline.
+    """
+    n_points = len(tour)
+    tree = KDTree(points)
+    neighbours = [tree.query(points[i], CUT_ORDER_NEIGHBOURS + 1)[1:] for i in range(n_points)]
+    start_neighbours = tree.query(start, CUT_ORDER_NEIGHBOURS)
+    position = [0] * n_points
+    for k, i in enumerate(tour):
+        position[i] = k
+
+    def point_at(k):
+        return start if k < 0 else points[tour[k]]
+
+    def is_valid(first, last):
+        # reversing tour[first:last + 1] flips the order of any child and
+        # parent both within it
+        for k in range(first, last + 1):
+            parent = parents[tour[k]]
+            if parent is not None and first <= position[parent] <= last:
+                return False
+        return True
+
+    for _ in range(CUT_ORDER_MAX_PASSES):
+        improved = False
+        for first in range(n_points):
+            before = point_at(first - 1)
+            for c in neighbours[tour[first - 1]] if first > 0 else start_neighbours:
+                last = position[c]
+                if last <= first:
+                    continue
+                after = point_at(last + 1) if last + 1 < n_points else None
+
+                removed = _travel(before, point_at(first))
+                added = _travel(before, point_at(last))
+                if after is not None:
+                    removed += _travel(point_at(last), after)
+                    added += _travel(point_at(first), after)
+
+                if added < removed - 1e-12 and is_valid(first, last):
+                    tour[first:last + 1] = tour[first:last + 1][::-1]
+                    for k in range(first, last + 1):
+                        position[tour[k]] = k
+                    improved = True
+                    before = point_at(first - 1)
+        if not improved:
+            break
+    return tour
+
+
+def get_travel_length(outlines, start: tuple = None) -> float:
+    """
+    Calculate the travel length of the laser head between the cuts of the
+    specified outlines, cut in order from their first vertex.
+
+    :param outlines: The outlines in cut order.
+    :param start: The (x, y) start position of the laser head, defaults to the
+                  minimum of the bounds of outlines.
+
+    :returns: The total travel length.
+    """
+    if not outlines:
+        return 0.0
+    if start is None:
+        start = get_bounds(outlines)[:2]
+    points = np.array([start] + [outline.coordinates[0] for outline in outlines])
+    steps = np.diff(points, axis=0)
+    return float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+
+
+# ------------------------------------------------------------------------------
+# Nest outlines onto sheets
+NEST_MIN_STEP_FRACTION = 1.0 / 64.0
+
+
+class NestPart(object):
+    """
+    The NestPart holds the outlines of a single object placed on a sheet.
+    """
+    def __init__(self, name: str, outlines: list):
+        """
+        Construct a new NestPart with the specified name and outlines, with
+        its bounding box moved to the origin.
+
+        :param name: The name of the object.
+        :param outlines: The outlines of the object.
+        """
+        self._name = name
+        self._outlines = [Outline(outline.coordinates.copy(), outline.first_index)
+                          for outline in outlines]
+        self._offset = (0.0, 0.0)
+        self._is_rotated = False
+        self._outer = None
+        self._move_to_origin()
+
+    def _move_to_origin(self):
+        min_x, min_y, max_x, max_y = get_bounds(self._outlines)
+        for outline in self._outlines:
+            outline.translate_by(-min_x, -min_y)
+        self._size = (max_x - min_x, max_y - min_y)
+
+    @property
+    def name(self) -> str:
+        """ The name of the object of this NestPart. """
+        return self._name
+
+    @property
+    def size(self) -> tuple:
+        """ The (width, height) of the bounding box of this NestPart. """
+        return self._size
+
+    @property
+    def offset(self) -> tuple:
+        """ The (x, y) position of the bounding box of this NestPart on its sheet. """
+        return self._offset
+
+    @offset.setter
+    def offset(self, value: tuple):
+        self._offset = value
+
+    @property
+    def is_rotated(self) -> bool:
+        """ Whether this NestPart has been rotated by 90 degrees. """
+        return self._is_rotated
+
+    @property
+    def bounds(self) -> tuple:
+        """ The (min_x, min_y, max_x, max_y) of this NestPart on its sheet. """
+        return (self._offset[0], self._offset[1],
+                self._offset[0] + self._size[0], self._offset[1] + self._size[1])
+
+    def rotate(self):
+        """ Rotate this NestPart by 90 degrees, or back if it was rotated. """
+        angle = -math.pi / 2.0 if self._is_rotated else math.pi / 2.0
+        for outline in self._outlines:
+            outline.rotate_by(angle)
+        self._move_to_origin()
+        self._is_rotated = not self._is_rotated
+
+    def get_placed_outlines(self) -> list:
+        """ Get copies of the outlines of this NestPart at its position on the sheet. """
+        result = []
+        for outline in self._outlines:
+            placed = Outline(outline.coordinates + self._offset, outline.first_index)
+            result.append(placed)
+        return result
+
+    def get_outer_segments(self, tolerance: float) -> np.ndarray:
+        """
+        Get the segments of the outermost outline of this NestPart, relative to
+        its bounding box, simplified with the specified tolerance.
+
+        :returns: The (N, 2, 2) array of segments.
+        """
+        if self._outer is None or self._outer[0] != (tolerance, self._is_rotated):
+            outer = max(self._outlines, key=lambda outline: np.prod(np.ptp(outline.coordinates, axis=0)))
+            coordinates = douglas_peucker(outer.coordinates, tolerance) if tolerance > 0.0 else outer.coordinates
+            segments = np.stack((coordinates, np.roll(coordinates, -1, axis=0)), axis=1)
+            self._outer = ((tolerance, self._is_rotated), segments)
+        return self._outer[1]
+
+
+class _Skyline(object):
+    """
+    Bottom left skyline packer over the usable area of a single sheet.
+    """
+    def __init__(self, width: float, height: float):
+        self._width = width
+        self._height = height
+        self._segments = [[0.0, 0.0, width]] # x, y, width
+
+    def find(self, width: float, height: float):
+        """
+        Find the lowest, then leftmost, position at which a box of the
+        specified size fits.
+
+        :returns: The (y, x) of the position, or None if it does not fit.
+        """
+        best = None
+        segments = self._segments
+        for i in range(len(segments)):
+            x = segments[i][0]
+            if x + width > self._width + 1e-9:
+                break
+
+            y = 0.0
+            j = i
+            remaining = width
+            while remaining > 1e-9:
+                y = max(y, segments[j][1])
+                remaining -= segments[j][2]
+                j += 1
+
+            if y + height <= self._height + 1e-9 and (best is None or (y, x) < best):
+                best = (y, x)
+        return best
+
+    def add(self, x: float, y: float, width: float, height: float):
+        """ Raise the skyline over [x, x + width) to y + height. """
+        end = x + width
+        segments = []
+        for seg_x, seg_y, seg_width in self._segments:
+            seg_end = seg_x + seg_width
+            if seg_end <= x or seg_x >= end:
+                segments.append([seg_x, seg_y, seg_width])
+                continue
+            if seg_x < x:
+                segments.append([seg_x, seg_y, x - seg_x])
+            if seg_end > end:
+                segments.append([end, seg_y, seg_end - end])
+        segments.append([x, y + height, width])
+        segments.sort()
+
+        # merge neighbouring segments at the same height
+        merged = [segments[0]]
+        for segment in segments[1:]:
+            if segment[1] == merged[-1][1]:
+                merged[-1][2] += segment[2]
+            else:
+                merged.append(segment)
+        self._segments = merged
+
+    @classmethod
+    def from_parts(cls, width: float, height: float, parts: list, spacing: float):
+        """
+        Construct the skyline over the tops of the specified placed parts.
+        """
+        skyline = cls(width, height)
+        for part in sorted(parts, key=lambda part: part.bounds[3]):
+            min_x, _, max_x, max_y = part.bounds
+            skyline.add(min_x - spacing, 0.0, max_x - min_x + spacing, max_y)
+        return skyline
+
+
+def _is_free(part: NestPart, offset: tuple, others: list, spacing: float, tolerance: float) -> bool:
+    """
+    Determine whether part placed at offset keeps at least spacing distance
+    from the outer outlines of the other parts.
+    """
+    min_x, min_y = offset
+    max_x, max_y = min_x + part.size[0], min_y + part.size[1]
+    segments = None
+
+    for other in others:
+        o_min_x, o_min_y, o_max_x, o_max_y = other.bounds
+        if (o_min_x > max_x + spacing or min_x > o_max_x + spacing or
+                o_min_y > max_y + spacing or min_y > o_max_y + spacing):
+            continue
+
+        if segments is None:
+            segments = part.get_outer_segments(tolerance) + offset
+        other_segments = other.get_outer_segments(tolerance) + other.offset
+
+        # only test the segments within the bounding box of the other part
+        lower = np.array((o_min_x - spacing, o_min_y - spacing))
+        upper = np.array((o_max_x + spacing, o_max_y + spacing))
+        in_other = ((segments.max(axis=1) >= lower) & (segments.min(axis=1) <= upper)).all(axis=1)
+
+        lower = np.array((min_x - spacing, min_y - spacing))
+        upper = np.array((max_x + spacing, max_y + spacing))
+        in_part = ((other_segments.max(axis=1) >= lower) & (other_segments.min(axis=1) <= upper)).all(axis=1)
+
+        if segments_within(segments[in_other], other_segments[in_part], spacing):
+            return False
+
+        # a part entirely within the other, or vice versa
+        if (o_min_x <= min_x and max_x <= o_max_x and o_min_y <= min_y and max_y <= o_max_y and
+                points_in_polygon(segments[:1, 0], other_segments[:, 0]).any()):
+            return False
+        if (min_x <= o_min_x and o_max_x <= max_x and min_y <= o_min_y and o_max_y <= max_y and
+                points_in_polygon(other_segments[:1, 0], segments[:, 0]).any()):
+            return False
+    return True
+
+
+def _refine_sheet(parts: list, spacing: float):
+    """
+    Move the parts on a sheet down and to the left as far as their actual
+    outlines allow, filling the gaps left by the bounding box packing.
+    """
+    index = GridIndex(max(max(part.size) for part in parts))
+    for i, part in enumerate(parts):
+        index.insert(i, part.bounds)
+
+    # the simplified outlines deviate at most tolerance from the actual ones
+    tolerance = spacing / 8.0
+    distance = spacing + 2.0 * tolerance
+
+    for i, part in enumerate(parts):
+        min_step = NEST_MIN_STEP_FRACTION * max(min(part.size), spacing)
+
+        for axis in (1, 0, 1, 0):
+            step = part.offset[axis] - spacing
+            while step >= min_step:
+                offset = list(part.offset)
+                offset[axis] -= step
+                offset = tuple(offset)
+
+                min_x, min_y, max_x, max_y = part.bounds
+                moved = (min_x - (step if axis == 0 else 0.0) - spacing,
+                         min_y - (step if axis == 1 else 0.0) - spacing,
+                         max_x + spacing, max_y + spacing)
+                others = [parts[j] for j in index.query(moved) if j != i]
+
+                if _is_free(part, offset, others, distance, tolerance):
+                    index.remove(i)
+                    part.offset = offset
+                    index.insert(i, part.bounds)
+                    step = min(step, part.offset[axis] - spacing)
+                else:
+                    step /= 2.0
+
+
+def _find_placement(skyline: _Skyline, part: NestPart, spacing: float, allow_rotation: bool):
+    """
+    Find the best position of part on the sheet of skyline.
+
+    :returns: ((y, x), is_rotated) of the placement, or None if part does not
+              fit. The orientation of part is left unchanged.
+    """
+    is_rotated = part.is_rotated
+    placement = None
+    for rotate in ((False, True) if allow_rotation else (False,)):
+        if rotate != part.is_rotated:
+            part.rotate()
+        position = skyline.find(part.size[0] + spacing, part.size[1] + spacing)
+        if position is not None and (placement is None or position < placement[0]):
+            placement = (position, rotate)
+
+    if part.is_rotated != is_rotated:
+        part.rotate()
+    return placement
+
+
+def nest_parts(parts: list, sheet_size: tuple, spacing: float,
+               allow_rotation: bool = True, refine: bool = False) -> list:
+    """
+    Pack the specified parts onto as few sheets as possible.
+
+    The parts are placed by their bounding box with a bottom left skyline
+    packer, largest first, on the first sheet on which they fit. With refine,
+    each part is afterwards moved down and left as far as its actual outline
+    allows.
+
+    :param parts: The (name, outlines) of each part to place.
+    :param sheet_size: The (width, height) of a sheet in user units.
+    :param spacing: The minimum distance between parts, and between the parts
+                    and the sheet border, in user units.
+    :param allow_rotation: If True parts may be rotated by 90 degrees.
+    :param refine: If True refine the placement with the part outlines.
+
+    :returns: A list of sheets, each a list of the placed NestParts.
+    """
+    to_place = [NestPart(name, outlines) for name, outlines in parts]
+    to_place.sort(key=lambda part: (max(part.size), part.size[0] * part.size[1]), reverse=True)
+
+    usable = (sheet_size[0] - spacing, sheet_size[1] - spacing)
+    skylines = []
+    sheets = []
+
+    for part in to_place:
+        placement = None
+        for sheet, skyline in enumerate(skylines):
+            placement = _find_placement(skyline, part, spacing, allow_rotation)
+            if placement is not None:
+                break
+
+        if placement is None:
+            sheet = len(skylines)
+            skylines.append(_Skyline(*usable))
+            sheets.append([])
+            placement = _find_placement(skylines[sheet], part, spacing, allow_rotation)
+            if placement is None:
+                raise Exception("Part {} does not fit on the sheet".format(part.name))
+
+        (y, x), rotate = placement
+        if rotate != part.is_rotated:
+            part.rotate()
+        skylines[sheet].add(x, y, part.size[0] + spacing, part.size[1] + spacing)
+        part.offset = (x + spacing, y + spacing)
+        sheets[sheet].append(part)
+
+    if not refine:
+        return sheets
+
+    # compact each sheet, and move parts of later sheets into the space freed
+    for i, sheet in enumerate(sheets):
+        _refine_sheet(sheet, spacing)
+        skyline = _Skyline.from_parts(usable[0], usable[1], sheet, spacing)
+
+        for later in sheets[i + 1:]:
+            for part in list(later):
+                placement = _find_placement(skyline, part, spacing, allow_rotation)
+                if placement is None:
+                    continue
+                (y, x), rotate = placement
+                if rotate != part.is_rotated:
+                    part.rotate()
+                skyline.add(x, y, part.size[0] + spacing, part.size[1] + spacing)
+                part.offset = (x + spacing, y + spacing)
+                later.remove(part)
+                sheet.append(part)
+
+        _refine_sheet(sheet, spacing)
+    return [sheet for sheet in sheets if sheet]
+
+
+def write_sheets_to_svg(sheets: list, sheet_size: tuple, file_name_pattern: str,
+                        document_settings: dict, unit_size: float, do_order_cuts: bool = False) -> list:
+    """
+    Write each of the specified sheets to its own svg document.
+
+    :param sheets: The sheets as returned by nest_parts.
+    :param sheet_size: The (width, height) of a sheet in user units.
+    :param file_name_pattern: The file name of each sheet, formatted with the
+                              sheet number.
+    :param document_settings: The document settings of the svg, see
+                              write_obj_to_svg.
+    :param unit_size: The unit size of each user unit in pixels.
+    :param do_order_cuts: If true order the outlines of each sheet to reduce
+                          the travel of the laser head, see order_cuts.
+
+    :returns: The file names of the written sheets.
+    """
+    file_names = []
+    for i, sheet in enumerate(sheets):
+        file_name = file_name_pattern.format(i)
+        outlines = [outline for part in sheet for outline in part.get_placed_outlines()]
+        if do_order_cuts:
+            outlines = order_cuts(outlines, start=(0.0, 0.0))
+        write_outlines_to_svg(outlines,
+                              file_name,
+                              (sheet_size[0] * unit_size, sheet_size[1] * unit_size),
+                              (0.0, 0.0),
+                              unit_size,
+                              document_settings)
+        file_names.append(file_name)
+    return file_names
+
+
+# ------------------------------------------------------------------------------
+# Tile outlines onto sheets
+TILE_MARGIN = 1.0
+TILE_MARK_SIZE = 0.5
+
+
+def clip_outline(outline, bounds: tuple) -> list:
+    """
+    Clip the specified outline to the specified box with the Liang-Barsky
+    algorithm, applied to all segments at once.
+
+    :param outline: The outline to clip.
+    :param bounds: The (min_x, min_y, max_x, max_y) bounds of the box.
+
+    :returns: A list with the outline itself if it lies within the box, or
+              the open outlines of the parts of outline within the box.
+    """
+    coordinates = outline.coordinates
+    if len(coordinates) < 2:
+        return []
+
+    min_x, min_y, max_x, max_y = bounds
+    if (coordinates.min(axis=0) >= (min_x, min_y)).all() and (coordinates.max(axis=0) <= (max_x, max_y)).all():
+        return [outline]
+
+    if outline.is_closed:
+        starts = coordinates
+        ends = np.roll(coordinates, -1, axis=0)
+    else:
+        starts = coordinates[:-1]
+        ends = coordinates[1:]
+    steps = ends - starts
+
+    # clip the parameter range [t_in, t_out] of each segment to each side
+    t_in = np.zeros(len(starts))
+    t_out = np.ones(len(starts))
+    is_visible = np.ones(len(starts), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-steps[:, 0], starts[:, 0] - min_x),
+                     (steps[:, 0], max_x - starts[:, 0]),
+                     (-steps[:, 1], starts[:, 1] - min_y),
+                     (steps[:, 1], max_y - starts[:, 1])):
+            ratio = q / p
+            is_visible &= (p != 0.0) | (q >= 0.0)
+            t_in = np.where(p < 0.0, np.maximum(t_in, ratio), t_in)
+            t_out = np.where(p > 0.0, np.minimum(t_out, ratio), t_out)
+    is_visible &= t_in < t_out
+
+    # chain the visible segments which connect at an unclipped vertex
+    is_connected = is_visible & (t_out == 1.0) & np.roll(is_visible & (t_in == 0.0), -1)
+    if not outline.is_closed:
+        is_connected[-1] = False
+    if is_visible.all() and is_connected.all():
+        return [outline]
+
+    # rotate a closed path such that no chain wraps around its end
+    first = int(np.argmin(is_connected)) + 1 if outline.is_closed else 0
+    order = np.roll(np.arange(len(starts)), -first)
+    is_visible = is_visible[order]
+    is_connected = is_connected[order]
+    clipped_starts = (starts + steps * t_in[:, None])[order]
+    clipped_ends = (starts + steps * t_out[:, None])[order]
+
+    result = []
+    chain = []
+    for k in np.flatnonzero(is_visible).tolist():
+        if not chain:
+            chain = [clipped_starts[k]]
+        chain.append(clipped_ends[k])
+        if not is_connected[k]:
+            result.append(Outline(chain, outline.first_index, is_closed=False))
+            chain = []
+    if chain:
+        result.append(Outline(chain, outline.first_index, is_closed=False))
+    return result
+
+
+def get_registration_marks(bounds: tuple, size: float) -> list:
+    """
+    Get the registration marks of a tile, a cross at each corner of bounds.
+
+    :param bounds: The (min_x, min_y, max_x, max_y) bounds of the tile.
+    :param size: The length of each arm of a cross.
+
+    :returns: The open outlines of the crosses.
+    """
+    min_x, min_y, max_x, max_y = bounds
+    result = []
+    for x, y in ((min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y)):
+        result.append(Outline([(x - size, y), (x + size, y)], is_closed=False))
+        result.append(Outline([(x, y - size), (x, y + size)], is_closed=False))
+    return result
+
+
+def write_tiles_to_svg(outlines, bed_size: tuple, file_name_pattern: str,
+                       document_settings: dict, unit_size: float,
+                       margin: float = TILE_MARGIN, mark_size: float = TILE_MARK_SIZE) -> list:
+    """
+    Split the specified outlines over tiles that fit onto the laser bed and
+    write each tile that is not empty to its own svg document.
+
+    The outlines are assigned to the tiles with a GridIndex, and clipped at
+    the tile boundaries with clip_outline. Tiles are written one at a time,
+    such that only the clipped outlines of a single tile are kept in memory.
+    The corners of each tile are marked with registration marks, which are
+    written as a separate path, such that adjacent tiles can be aligned.
+
+    :param outlines: The outlines to write, in user units.
+    :param bed_size: The (width, height) of the laser bed in user units.
+    :param file_name_pattern: The file name of each tile, formatted with the
+                              row and column of the tile.
+    :param document_settings: The document settings of the svg, see
+                              write_obj_to_svg.
+    :param unit_size: The unit size of each user unit in pixels.
+    :param margin: The margin in user units around each tile within the bed,
+                   which holds the registration marks.
+    :param mark_size: The length of the arms of the registration marks.
+
+    :returns: The (file name, (row, column)) of each written tile.
+    """
+    tile_x = bed_size[0] - 2.0 * margin
+    tile_y = bed_size[1] - 2.0 * margin
+    if tile_x <= 0.0 or tile_y <= 0.0:
+        raise Exception("The bed is smaller than its margins")
+
+    # move the design such that tile (0, 0) starts at its minimum
+    min_x, min_y, max_x, max_y = get_bounds(outlines)
+    n_columns = max(int(math.ceil((max_x - min_x) / tile_x)), 1)
+    n_rows = max(int(math.ceil((max_y - min_y) / tile_y)), 1)
+
+    index = GridIndex(max(tile_x, tile_y))
+    for i, outline in enumerate(outlines):
+        coordinates = outline.coordinates
+        index.insert(i, (float(coordinates[:, 0].min()), float(coordinates[:, 1].min()),
+                         float(coordinates[:, 0].max()), float(coordinates[:, 1].max())))
+
+    size = (bed_size[0] * unit_size, bed_size[1] * unit_size)
+    document_settings = dict(document_settings, debug=False)
+    result = []
+    for row in range(n_rows):
+        for column in range(n_columns):
+            bounds = (min_x + column * tile_x, min_y + row * tile_y,
+                      min_x + (column + 1) * tile_x, min_y + (row + 1) * tile_y)
+            tile = [clipped
+                    for i in sorted(index.query(bounds))
+                    for clipped in clip_outline(outlines[i], bounds)]
+            if not tile:
+                continue
+
+            translation = ((margin - bounds[0]) * unit_size, (margin - bounds[1]) * unit_size)
+            curve_tolerance = document_settings.get("curve-tolerance", None)
+            path_data = iter_path_data(tile,
+                                       unit_size,
+                                       translation,
+                                       precision=document_settings.get("precision", None),
+                                       relative=document_settings.get("relative", False),
+                                       curve_tolerance=(None if curve_tolerance is None
+                                                        else curve_tolerance * unit_size),
+                                       fit_beziers=document_settings.get("fit-beziers", False))
+            mark_data = iter_path_data(get_registration_marks(bounds, mark_size),
+                                       unit_size,
+                                       translation,
+                                       precision=document_settings.get("precision", None))
+
+            file_name = file_name_pattern.format(row, column)
+            _write_svg_stream(file_name, path_data, size, document_settings, mark_data)
+            result.append((file_name, (row, column)))
+    return result
+
+
+# ------------------------------------------------------------------------------
+# Batch export
+def export_outlines(outlines, file_name: str, export_settings: dict):
+    """
+    Simplify the specified outlines, orient holes opposite to the outlines
+    enclosing them and write them to file_name.
+
+    :param outlines: The outlines of the object that should be written away.
+    :param file_name: The file name to which the svg drawing is written.
+    :param export_settings: The settings of the export, containing padding,
+                            document_settings, unit_size, do_rotate,
+                            rotation_mode, simplify_tolerance and
+                            simplify_method, and optionally order_cuts, and
+                            weld_tolerance and split_islands, which are used
+                            by the callers that trace the outlines.
+
+    :returns: The simplified outlines that were written.
+    """
+    return write_outlines(simplify_outlines(outlines,
+                                            tolerance=export_settings["simplify_tolerance"],
+                                            method=export_settings["simplify_method"]),
+                          file_name,
+                          export_settings)
+
+
+def write_outlines(outlines, file_name: str, export_settings: dict):
+    """
+    Orient holes opposite to the outlines enclosing them and write the
+    specified, already simplified, outlines to file_name.
+
+    :param outlines: The outlines of the object that should be written away.
+    :param file_name: The file name to which the svg drawing is written.
+    :param export_settings: The settings of the export, see export_outlines.
+
+    :returns: The outlines that were written.
+    """
+    # the containment hierarchy is kept by the rotation, hence it is shared
+    # with the cut order
+    with stage("orient"):
+        parents = get_containing_outlines(outlines)
+        outlines = orient_outlines(outlines, classify_outlines(outlines, parents))
+    write_obj_to_svg(outlines=outlines,
+                     padding=export_settings["padding"],
+                     file_name=file_name,
+                     document_settings=export_settings["document_settings"],
+                     unit_size=export_settings["unit_size"],
+                     do_rotate=export_settings["do_rotate"],
+                     rotation_mode=export_settings["rotation_mode"],
+                     do_order_cuts=export_settings.get("order_cuts", False),
+                     parents=parents)
+    return outlines
+
+
+def get_outline_sets(coordinates: np.ndarray,
+                     face_vertices: np.ndarray,
+                     face_sizes: np.ndarray,
+                     export_settings: dict) -> list:
+    """
+    Trace and simplify the outlines of the specified mesh, split into its
+    planar islands if split_islands is set in export_settings. Each outline is
+    simplified as soon as it is traced, such that the unsimplified outlines
+    are never all held in memory.
+
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+    :param export_settings: The settings of the export, see export_outlines.
+
+    :returns: A list with the list of simplified Outlines of each island, or
+              with the single list of simplified Outlines of the mesh.
+    """
+    weld_tolerance = export_settings.get("weld_tolerance", WELD_TOLERANCE)
+    if export_settings.get("split_islands", False):
+        outline_sets = iter_island_outlines_from_arrays(coordinates, face_vertices, face_sizes, weld_tolerance)
+    else:
+        outline_sets = [iter_outlines_from_arrays(coordinates, face_vertices, face_sizes, weld_tolerance)]
+
+    return list(simplify_outlines(outlines,
+                                  tolerance=export_settings["simplify_tolerance"],
+                                  method=export_settings["simplify_method"])
+                for outlines in outline_sets)
+
+
+def get_arranged_outlines(coordinates: np.ndarray,
+                          face_vertices: np.ndarray,
+                          face_sizes: np.ndarray,
+                          export_settings: dict) -> list:
+    """
+    Trace and simplify the outlines of the specified mesh, rotated according
+    to export_settings. If the mesh is split into planar islands each island is
+    rotated by itself and placed next to the others, as far apart as two
+    separately exported documents.
+
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+    :param export_settings: The settings of the export, see export_outlines.
+
+    :returns: The list of Outlines of the mesh.
+    """
+    outline_sets = get_outline_sets(coordinates, face_vertices, face_sizes, export_settings)
+    if export_settings["do_rotate"]:
+        with stage("rotate"):
+            for outlines in outline_sets:
+                rotate_outlines(outlines, export_settings["rotation_mode"])
+
+    if len(outline_sets) == 1:
+        return outline_sets[0]
+    padding = export_settings["padding"]
+    return arrange_outline_sets(outline_sets,
+                                (padding["x-neg"] + padding["x-pos"]) / export_settings["unit_size"])
+
+
+def export_mesh_arrays(job: tuple, profile_file: str = None) -> dict:
+    """
+    Trace, simplify and write the outlines of a single mesh. This runs within
+    the worker processes of export_batch.
+
+    :param job: (name, coordinates, face_vertices, face_sizes, file_name,
+                 export_settings) of the mesh to export, optionally followed
+                 by the transform of the object, which is only used as part
+                 of the export key.
+    :param profile_file: If not None, the export is profiled with cProfile and
+                         the statistics are dumped to this file.
+
+    :returns: A summary of the export with the name, file_name, number of
+              outlines and vertices, the wall time in seconds, the error
+              message if the export failed and the report of the wall time
+              and counters of each stage, see ExportReport.
+    """
+    name, coordinates, face_vertices, face_sizes, file_name, export_settings = job[:6]
+    start = time.perf_counter()
+    summary = {"name": name,
+               "file_name": file_name,
+               "outlines": 0,
+               "vertices": 0,
+               "error": None,
+               "cached": False}
+
+    report = ExportReport()
+    profiler = cProfile.Profile() if profile_file is not None else None
+    try:
+        with instrument(report):
+            if profiler is not None:
+                profiler.enable()
+            try:
+                outlines = write_outlines(get_arranged_outlines(coordinates, face_vertices, face_sizes,
+                                                                export_settings),
+                                          file_name,
+                                          dict(export_settings, do_rotate=False))
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    profiler.dump_stats(profile_file)
+        summary["outlines"] = len(outlines)
+        summary["vertices"] = sum(len(outline) for outline in outlines)
+    except Exception as e:
+        summary["error"] = "{}: {}".format(type(e).__name__, e)
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["report"] = report.as_dict()
+    return summary
+
+
+# ------------------------------------------------------------------------------
+# Export cache
+EXPORT_CACHE_FILE = ".lasercut_export_cache.json"
+
+
+_source_digest = None
+
+
+def get_source_digest() -> str:
+    """
+    Get the hex digest of the source of this script, such that exports are
+    redone whenever the exporter changes. When the source cannot be found,
+    e.g. for a script run from an unsaved text in blender, a random digest is
+    returned, such that nothing is served from the cache.
+    """
+    global _source_digest
+    if _source_digest is not None:
+        return _source_digest
+
+    source = None
+    try:
+        with open(__file__, "rb") as f:
+            source = f.read()
+    except OSError:
+        # run from the text editor of blender, __file__ names the text
+        if bpy is not None:
+            text = bpy.data.texts.get(os.path.basename(__file__))
+            if text is not None:
+                source = text.as_string().encode("utf-8")
+
+    if source is None:
+        _source_digest = os.urandom(20).hex()
+    else:
+        _source_digest = hashlib.sha1(source).hexdigest()
+    return _source_digest
+
+
+def get_export_key(coordinates: np.ndarray,
+                   face_vertices: np.ndarray,
+                   face_sizes: np.ndarray,
+                   export_settings: dict,
+                   transform=None) -> str:
+    """
+    Calculate the content hash of an export, which changes whenever the mesh
+    data, transform, export settings or the source of this script change, see
+    get_source_digest.
+
+    :param coordinates: The (N, 3) array of vertex coordinates
+    :param face_vertices: The flat array of the vertex indices of all faces
+    :param face_sizes: The number of vertices of each face
+    :param export_settings: The settings of the export, see export_outlines.
+    :param transform: The optional transform of the object, as an array like.
+
+    :returns: The hex digest of the export.
+    """
+    digest = hashlib.sha1()
+    digest.update(get_source_digest().encode("utf-8"))
+    digest.update(json.dumps(export_settings, sort_keys=True).encode("utf-8"))
+    for values in (np.asarray(coordinates, dtype=np.float64),
+                   np.asarray(face_vertices, dtype=np.int64),
+                   np.asarray(face_sizes, dtype=np.int64)):
+        digest.update(str(values.shape).encode("utf-8"))
+        digest.update(np.ascontiguousarray(values).tobytes())
+    if transform is not None:
+        digest.update(np.asarray(transform, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class ExportCache(object):
+    """
+    The ExportCache records the export key of every written svg file, such
+    that unchanged objects are not traced and written again.
+    """
+    def __init__(self, path: str):
+        """
+        Construct a new ExportCache stored at path, loading its existing
+        entries if any.
+
+        :param path: The path of the json file holding the cache entries.
+        """
+        self._path = path
+        self._entries = {}
+
+        if os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except ValueError:
+                self._entries = {} # a corrupt cache only costs a re-export
+
+    @property
+    def path(self) -> str:
+        """ The path of the json file holding the cache entries. """
+        return self._path
+
+    @staticmethod
+    def _stat(file_name: str):
+        stat = os.stat(file_name)
+        return [stat.st_size, stat.st_mtime]
+
+    def get(self, file_name: str, key: str):
+        """
+        Get the cached summary of file_name if it was written with the
+        specified key and has not been changed since.
+
+        :param file_name: The svg file name.
+        :param key: The export key, see get_export_key.
+
+        :returns: The summary of the cached export, or None if file_name
+                  needs to be exported.
+        """
+        entry = self._entries.get(file_name)
+        if entry is None or entry["key"] != key or not os.path.isfile(file_name):
+            return None
+        if self._stat(file_name) != entry["stat"]:
+            return None
+        return entry["summary"]
+
+    def update(self, file_name: str, key: str, summary: dict):
+        """
+        Record that file_name was written with the specified key.
+
+        :param file_name: The svg file name.
+        :param key: The export key, see get_export_key.
+        :param summary: The summary of the export.
+        """
+        self._entries[file_name] = {"key": key,
+                                    "stat": self._stat(file_name),
+                                    "summary": summary}
+
+    def save(self):
+        """ Write the cache entries to the json file. """
+        with open(self._path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=1, sort_keys=True)
+
+
+BATCH_JOBS_PER_WORKER = 2
+
+
+def _get_pool_context():
+    """
+    Get the multiprocessing context used for the worker processes. Forking is
+    preferred, as spawned processes within blender need to be started with the
+    python executable bundled with blender instead of blender itself.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+
+    context = multiprocessing.get_context("spawn")
+    if bpy is not None and hasattr(bpy.app, "binary_path_python"):
+        context.set_executable(bpy.app.binary_path_python)
+    return context
+
+
+def export_batch(jobs, workers: int = None, cache: ExportCache = None, profile: str = None) -> list:
+    """
+    Export the specified jobs, fanning them out over a pool of worker
+    processes.
+
+    The jobs are consumed lazily and at most BATCH_JOBS_PER_WORKER jobs per
+    worker are in flight at once, such that the peak memory is bounded by a
+    few objects rather than all of them.
+
+    :param jobs: An iterable of the jobs as accepted by export_mesh_arrays.
+    :param workers: The number of worker processes, defaults to the number of
+                    cores. With a single worker the jobs are exported within
+                    the calling process.
+    :param cache: The optional ExportCache, jobs of which the svg file is up
+                  to date are skipped.
+    :param profile: The optional name of a job of which the export is profiled
+                    with cProfile, the statistics are dumped next to its svg
+                    file with the .prof extension.
+
+    :returns: The summaries of all exports, in the order of jobs.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    summaries = []
+    keys = {}
+    pending = collections.deque()
+    pool = None
+
+    def store(i, summary):
+        summaries[i] = summary
+        if cache is not None and not summary["error"]:
+            cache.update(summary["file_name"], keys.pop(i), summary)
+
+    try:
+        for i, job in enumerate(jobs):
+            summaries.append(None)
+            profile_file = None
+            if profile is not None and job[0] == profile:
+                profile_file = os.path.splitext(job[4])[0] + ".prof"
+            if cache is not None:
+                name, coordinates, face_vertices, face_sizes, file_name, export_settings = job[:6]
+                transform = job[6] if len(job) > 6 else None
+                keys[i] = get_export_key(coordinates, face_vertices, face_sizes,
+                                         export_settings, transform)
+                # the profiled job is always exported
+                cached = cache.get(file_name, keys[i]) if profile_file is None else None
+                if cached is not None:
+                    summaries[i] = dict(cached, name=name, seconds=0.0, cached=True, report=None)
+                    del keys[i]
+                    continue
+
+            if workers <= 1:
+                store(i, export_mesh_arrays(job[:6], profile_file))
+                continue
+
+            # the pool is only started once there is work to do
+            if pool is None:
+                pool = _get_pool_context().Pool(workers)
+            while len(pending) >= workers * BATCH_JOBS_PER_WORKER:
+                store(pending[0][0], pending.popleft()[1].get())
+            pending.append((i, pool.apply_async(export_mesh_arrays, (job[:6], profile_file))))
+
+        while pending:
+            store(pending[0][0], pending.popleft()[1].get())
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if cache is not None:
+        cache.save()
+    return summaries
+
+
+def export_objects_batch(objects, export_settings: dict, file_name_of,
+                         workers: int = None, cache: ExportCache = None, profile: str = None) -> list:
+    """
+    Export the specified blender objects in parallel. The mesh arrays are
+    extracted from blender on the main thread, one object at a time as the
+    workers need them, after which tracing, simplification and writing run
+    in worker processes.
+
+    :param objects: The blender objects to export.
+    :param export_settings: The settings of the export, see export_outlines.
+    :param file_name_of: Function that maps an object to its svg file name.
+    :param workers: The number of worker processes, see export_batch.
+    :param cache: The optional ExportCache used to skip unchanged objects.
+    :param profile: The optional name of an object of which the export is
+                    profiled, see export_batch.
+
+    :returns: The summaries of all exports.
+    """
+    jobs = ((obj.name,) + get_mesh_arrays(obj) + (file_name_of(obj), export_settings, np.array(obj.matrix_world))
+            for obj in objects)
+    return export_batch(jobs, workers, cache, profile)
+
+
+def print_batch_summary(summaries: list, wall_time: float):
+    """
+    Print the results of a batch export.
+
+    :param summaries: The summaries as returned by export_batch.
+    :param wall_time: The total wall time of the batch export in seconds.
+    """
+    failed = [summary for summary in summaries if summary["error"]]
+    cached = [summary for summary in summaries if summary.get("cached")]
+
+    for summary in summaries:
+        if summary["error"]:
+            print("  FAILED    {}: {}".format(summary["name"], summary["error"]))
+        elif summary.get("cached"):
+            print("  Cached    {} -> {}".format(summary["name"], summary["file_name"]))
+        else:
+            print("  Exported  {} -> {} ({} outlines, {} vertices, {:.3f}s)".format(
+                summary["name"], summary["file_name"],
+                summary["outlines"], summary["vertices"], summary["seconds"]))
+
+    print("Exported {} of {} objects ({} cached) in {:.3f}s ({:.3f}s of work)".format(
+        len(summaries) - len(failed), len(summaries), len(cached), wall_time,
+        sum(summary["seconds"] for summary in summaries)))
+
+
+def get_export_report(summaries: list) -> dict:
+    """
+    Collect the reports of the specified summaries into a single structured
+    report.
+
+    :param summaries: The summaries as returned by export_batch.
+
+    :returns: A dict with the objects, the name, file_name, seconds and the
+              seconds and counts of each stage of every exported object, and
+              the totals, the seconds and counts summed over all objects.
+    """
+    objects = []
+    total_seconds = {}
+    total_counts = {}
+    for summary in summaries:
+        if not summary.get("report"):
+            continue
+        report = summary["report"]
+        objects.append({"name": summary["name"],
+                        "file_name": summary["file_name"],
+                        "seconds": summary["seconds"],
+                        "stages": report["seconds"],
+                        "counts": report["counts"]})
+        for name, seconds in report["seconds"].items():
+            total_seconds[name] = total_seconds.get(name, 0.0) + seconds
+        for name, value in report["counts"].items():
+            total_counts[name] = total_counts.get(name, 0) + value
+
+    return {"objects": objects,
+            "totals": {"seconds": total_seconds, "counts": total_counts}}
+
+
+def print_export_report(report: dict):
+    """
+    Print the time spent in each stage and the counters of the specified
+    report, summed over all objects.
+
+    :param report: The report as returned by get_export_report.
+    """
+    total_seconds = report["totals"]["seconds"]
+    total = sum(total_seconds.values())
+    for name, seconds in sorted(total_seconds.items(), key=lambda item: -item[1]):
+        print("  {:<16} {:>9.4f}s {:>6.1%}".format(name, seconds, seconds / total if total > 0.0 else 0.0))
+    print("  " + ", ".join("{} {}".format(name, value)
+                           for name, value in sorted(report["totals"]["counts"].items())))
+
+
+def export_nested(meshes: list, export_settings: dict, nest_settings: dict,
+                  file_name_pattern: str) -> list:
+    """
+    Trace and simplify the outlines of the specified meshes, nest them onto
+    sheets and write one svg file per sheet.
+
+    :param meshes: An iterable of the (name, coordinates, face_vertices,
+                   face_sizes) of each mesh to export, consumed one mesh at a
+                   time such that only the traced outlines are kept.
+    :param export_settings: The settings of the export, see export_outlines.
+                            The padding is replaced by the nest spacing.
+    :param nest_settings: The settings of the nesting, containing sheet_size,
+                          spacing, allow_rotation and refine, see nest_parts.
+    :param file_name_pattern: The file name of each sheet, formatted with the
+                              sheet number.
+
+    :returns: The (file name, names of the placed parts) of each sheet.
+    """
+    parts = []
+    for name, coordinates, face_vertices, face_sizes in meshes:
+        outline_sets = get_outline_sets(coordinates, face_vertices, face_sizes, export_settings)
+        for i, outlines in enumerate(outline_sets):
+            outlines = orient_outlines(outlines)
+            if export_settings["do_rotate"]:
+                rotate_outlines(outlines, export_settings["rotation_mode"])
+            parts.append((name if len(outline_sets) == 1 else "{}[{}]".format(name, i), outlines))
+
+    sheets = nest_parts(parts,
+                        nest_settings["sheet_size"],
+                        nest_settings["spacing"],
+                        allow_rotation=nest_settings["allow_rotation"],
+                        refine=nest_settings["refine"])
+    file_names = write_sheets_to_svg(sheets,
+                                     nest_settings["sheet_size"],
+                                     file_name_pattern,
+                                     export_settings["document_settings"],
+                                     export_settings["unit_size"],
+                                     do_order_cuts=export_settings.get("order_cuts", False))
+    return list((file_name, [part.name for part in sheet])
+                for file_name, sheet in zip(file_names, sheets))
+
+
+def export_tiled(meshes: list, export_settings: dict, tile_settings: dict) -> list:
+    """
+    Trace and simplify the outlines of the specified meshes, and split each
+    of them over tiles that fit onto the laser bed, see write_tiles_to_svg.
+
+    :param meshes: An iterable of the (name, coordinates, face_vertices,
+                   face_sizes, file_name_pattern) of each mesh to export, in
+                   which the pattern is formatted with the row and column of
+                   a tile. The meshes are consumed one at a time.
+    :param export_settings: The settings of the export, see export_outlines.
+    :param tile_settings: The settings of the tiling, containing bed_size and
+                          optionally margin and mark_size.
+
+    :returns: The (name, file names of the tiles) of each mesh.
+    """
+    result = []
+    for name, coordinates, face_vertices, face_sizes, file_name_pattern in meshes:
+        outlines = get_arranged_outlines(coordinates, face_vertices, face_sizes, export_settings)
+        tiles = write_tiles_to_svg(orient_outlines(outlines),
+                                   tile_settings["bed_size"],
+                                   file_name_pattern,
+                                   export_settings["document_settings"],
+                                   export_settings["unit_size"],
+                                   margin=tile_settings.get("margin", TILE_MARGIN),
+                                   mark_size=tile_settings.get("mark_size", TILE_MARK_SIZE))
+        result.append((name, [file_name for file_name, _ in tiles]))
+    return result
+
+
+def print_tile_summary(meshes: list, wall_time: float):
+    """
+    Print the results of a tiled export.
+
+    :param meshes: The results as returned by export_tiled.
+    :param wall_time: The total wall time of the export in seconds.
+    """
+    for name, file_names in meshes:
+        print("  Tiled     {} -> {} tiles".format(name, len(file_names)))
+    print("Tiled {} objects onto {} tiles in {:.3f}s".format(
+        len(meshes), sum(len(file_names) for _, file_names in meshes), wall_time))
+
+
+def print_nest_summary(sheets: list, wall_time: float):
+    """
+    Print the results of a nested export.
+
+    :param sheets: The sheets as returned by export_nested.
+    :param wall_time: The total wall time of the export in seconds.
+    """
+    for file_name, names in sheets:
+        print("  Sheet     {} ({} parts): {}".format(file_name, len(names), ", ".join(names)))
+    print("Nested {} parts onto {} sheets in {:.3f}s".format(
+        sum(len(names) for _, names in sheets), len(sheets), wall_time))
+
+
+# ------------------------------------------------------------------------------
+# Live export
+# The add-on mode re-exports LC objects as soon as they are edited. Blender
+# reports every change through its update handlers, the changed objects are
+# collected and, once no changes have come in for LIVE_EXPORT_DELAY seconds,
+# their mesh arrays are extracted on the main thread and exported by the
+# worker processes of a pool, such that the UI is never blocked on tracing
+# or writing.
+LIVE_EXPORT_DELAY = 0.5
+LIVE_POLL_INTERVAL = 0.1
+
+
+def get_default_export_settings(unit_dict: dict) -> dict:
+    """
+    Get the default settings of the export, see export_outlines.
+
+    :param unit_dict: The unit dictionary, see construct_unit_dict.
+    """
+    return {"padding": {"x-neg":1.0 * unit_dict["cm"],
+                        "x-pos":1.0 * unit_dict["cm"],
+                        "y-neg":1.0 * unit_dict["cm"],
+                        "y-pos":1.0 * unit_dict["cm"]},
+            # validated by svgwrite, with exact absolute coordinates and
+            # straight lines. Set precision (e.g. 4), relative and
+            # curve-tolerance (e.g. 0.005) for smaller files, and debug to
+            # False to skip the validation.
+            "document_settings": {"profile": "tiny",
+                                  "debug": True,
+                                  "precision": None,
+                                  "relative": False,
+                                  "curve-tolerance": None,
+                                  "fit-beziers": False,
+                                  "stroke": "black",
+                                  "stroke-width": 1.0,
+                                  "fill": "white",
+                                  "fill-opacity": 0.0},
+            "unit_size": unit_dict["cm"],
+            "do_rotate": False,
+            "rotation_mode": "longest-edge",
+            "simplify_tolerance": 0.0,
+            "simplify_method": "douglas-peucker",
+            "order_cuts": True,
+            "weld_tolerance": WELD_TOLERANCE,
+            "split_islands": False}
+
+
+class LiveExporter(object):
+    """
+    The LiveExporter re-exports the LC objects that changed since their last
+    export in the background.
+
+    Changes are recorded by on_update, which is registered as update handler.
+    Rapid edits are coalesced: an object is only exported once it has not
+    changed for delay seconds, and an object is never exported twice at the
+    same time, such that an older export cannot overwrite a newer one.
+    """
+    def __init__(self, export_settings: dict, file_name_of,
+                 with_substring: str = "LC",
+                 delay: float = LIVE_EXPORT_DELAY,
+                 workers: int = None,
+                 cache: ExportCache = None):
+        """
+        Construct a new LiveExporter.
+
+        :param export_settings: The settings of the export, see export_outlines.
+        :param file_name_of: Function that maps an object to its svg file name.
+        :param with_substring: Only objects of which the name starts with this
+                               substring are exported.
+        :param delay: The number of seconds without changes after which the
+                      changed objects are exported.
+        :param workers: The number of worker processes, defaults to the
+                        number of cores.
+        :param cache: The optional ExportCache, which skips objects of which
+                      the export key did not change, e.g. when only their
+                      selection changed.
+        """
+        self._export_settings = export_settings
+        self._file_name_of = file_name_of
+        self._with_substring = with_substring
+        self._delay = delay
+        self._workers = workers or os.cpu_count() or 1
+        self._cache = cache
+
+        self._changed = {}   # name -> time of the last change
+        self._pending = {}   # name -> (key, AsyncResult)
+        self._pool = None
+
+    @property
+    def is_busy(self) -> bool:
+        """ Whether changed objects are waiting for or being exported. """
+        return bool(self._changed or self._pending)
+
+    def _is_exported(self, obj) -> bool:
+        return obj.type == 'MESH' and str(obj.name).startswith(self._with_substring)
+
+    def _get_changed_objects(self, scene, depsgraph):
+        if depsgraph is not None:
+            for update in depsgraph.updates:
+                if (isinstance(update.id, bpy.types.Object)
+                        and (update.is_updated_geometry or update.is_updated_transform)):
+                    yield update.id.original
+        else:
+            # blender 2.7x flags the updated objects until the next update
+            for obj in scene.objects:
+                if obj.is_updated or obj.is_updated_data:
+                    yield obj
+
+    def on_update(self, scene, depsgraph=None):
+        """
+        Record the LC objects changed by the last update of scene.
+
+        :param scene: The updated scene.
+        :param depsgraph: The updated depsgraph in blender 2.8 and up, None in
+                          blender 2.7x.
+        """
+        now = time.perf_counter()
+        for obj in self._get_changed_objects(scene, depsgraph):
+            if self._is_exported(obj):
+                self._changed[obj.name] = now
+
+    def poll(self):
+        """
+        Collect the finished exports and start the export of the objects that
+        have not changed for delay seconds.
+        """
+        for name, (key, result) in list(self._pending.items()):
+            if result.ready():
+                del self._pending[name]
+                self._finish(key, result.get())
+
+        now = time.perf_counter()
+        for name, changed in list(self._changed.items()):
+            if now - changed < self._delay or name in self._pending:
+                continue
+            del self._changed[name]
+            obj = bpy.data.objects.get(name)
+            if obj is not None:
+                self._start(obj)
+
+    def _start(self, obj):
+        if obj.mode == 'EDIT' and hasattr(obj, "update_from_editmode"):
+            obj.update_from_editmode()
+        coordinates, face_vertices, face_sizes = get_mesh_arrays(obj)
+        file_name = self._file_name_of(obj)
+        job = (obj.name, coordinates, face_vertices, face_sizes, file_name, self._export_settings)
+
+        key = get_export_key(coordinates, face_vertices, face_sizes,
+                             self._export_settings, np.array(obj.matrix_world))
+        if self._cache is not None and self._cache.get(file_name, key) is not None:
+            return
+
+        if self._pool is None:
+            self._pool = _get_pool_context().Pool(self._workers)
+        self._pending[obj.name] = (key, self._pool.apply_async(export_mesh_arrays, (job,)))
+
+    def _finish(self, key: str, summary: dict):
+        if summary["error"]:
+            print("  FAILED    {}: {}".format(summary["name"], summary["error"]))
+            return
+        print("  Exported  {} -> {} ({} outlines, {} vertices, {:.3f}s)".format(
+            summary["name"], summary["file_name"],
+            summary["outlines"], summary["vertices"], summary["seconds"]))
+        if self._cache is not None:
+            self._cache.update(summary["file_name"], key, summary)
+            self._cache.save()
+
+    def close(self):
+        """ Stop the worker processes, abandoning the running exports. """
+        self._changed.clear()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+_live_exporter = None
+
+
+def _on_live_update(scene, depsgraph=None):
+    """
+    The update handler of the add-on. In blender 2.7x scene_update_post runs
+    on every pass of the event loop and therefore polls the exports as well,
+    later versions poll from a timer while there is work left.
+    """
+    if _live_exporter is None:
+        return
+    _live_exporter.on_update(scene, depsgraph)
+
+    if depsgraph is None:
+        _live_exporter.poll()
+    elif _live_exporter.is_busy and not bpy.app.timers.is_registered(_on_live_timer):
+        bpy.app.timers.register(_on_live_timer, first_interval=LIVE_POLL_INTERVAL)
+
+
+def _on_live_timer():
+    if _live_exporter is None:
+        return None
+    _live_exporter.poll()
+    return LIVE_POLL_INTERVAL if _live_exporter.is_busy else None
+
+
+def _get_update_handlers() -> list:
+    if hasattr(bpy.app.handlers, "depsgraph_update_post"):
+        return bpy.app.handlers.depsgraph_update_post
+    return bpy.app.handlers.scene_update_post
+
+
+def register():
+    """
+    Register the add-on, which re-exports the LC objects to svg files next to
+    the blend file whenever they are edited.
+    """
+    global _live_exporter
+    unregister()
+
+    _live_exporter = LiveExporter(get_default_export_settings(construct_unit_dict(96.0)),
+                                  lambda obj: bpy.path.abspath("//{}.svg".format(obj.name[4:])),
+                                  cache=ExportCache(bpy.path.abspath("//" + EXPORT_CACHE_FILE)))
+    # keep the handler registered when another blend file is loaded
+    _get_update_handlers().append(bpy.app.handlers.persistent(_on_live_update))
+
+
+def unregister():
+    """ Unregister the add-on, stopping the running exports. """
+    global _live_exporter
+    handlers = _get_update_handlers()
+    if _on_live_update in handlers:
+        handlers.remove(_on_live_update)
+    if hasattr(bpy.app, "timers") and bpy.app.timers.is_registered(_on_live_timer):
+        bpy.app.timers.unregister(_on_live_timer)
+
+    if _live_exporter is None:
+        return
+
+    _live_exporter.close()
+    _live_exporter = None
+
+
+if __name__ == '__main__':
+    unit_dict = construct_unit_dict(96.0)
+    objects = get_selected_objects(only_selected=False,
+                                   with_substring="LC")
 
+    export_settings = get_default_export_settings(unit_dict)
+
+    # Set to a dict to nest all objects onto sheets, instead of writing one
+    # svg per object, e.g.
+    # {"sheet_size": (60.0, 40.0), "spacing": 0.3, "allow_rotation": True, "refine": True}
+    nest_settings = None
+
+    # Set to the name of an object to dump a cProfile of its export
+    profile = None
+
+    # Set to a dict to split each object over tiles of the laser bed, e.g.
+    # {"bed_size": (60.0, 40.0), "margin": 1.0, "mark_size": 0.5}
+    tile_settings = None
+
+    # Set to True to keep re-exporting the LC objects whenever they are edited,
+    # like the add-on does, instead of exporting them once
+    live = False
+
+    start = time.perf_counter()
+    if live:
+        register()
+    elif tile_settings is not None:
+        tiled = export_tiled(((obj.name,) + get_mesh_arrays(obj) + ("{}_{{}}_{{}}.svg".format(obj.name[4:]),)
+                              for obj in objects),
+                             export_settings,
+                             tile_settings)
+        print_tile_summary(tiled, time.perf_counter() - start)
+    elif nest_settings is not None:
+        sheets = export_nested(((obj.name,) + get_mesh_arrays(obj) for obj in objects),
+                               export_settings,
+                               nest_settings,
+                               "sheet_{}.svg")
+        print_nest_summary(sheets, time.perf_counter() - start)
+    else:
+        summaries = export_objects_batch(objects,
+                                         export_settings,
+                                         lambda obj: "{}.svg".format(obj.name[4:]),
+                                         workers=os.cpu_count(),
+                                         cache=ExportCache(EXPORT_CACHE_FILE),
+                                         profile=profile)
+        print_batch_summary(summaries, time.perf_counter() - start)
+        print_export_report(get_export_report(summaries))
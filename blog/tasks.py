@@ -6,11 +6,15 @@ Invoke tasks.py script to update my pelican blog.
 # Libraries
 from invoke import task
 from plumbum import local, FG
-from shutil import copyfile
 
 import os
+import sys
 from pathlib import Path
-import filecmp
+
+# directory_sync.py is shared by the tasks.py scripts, it is found either in the
+# sync folder of this repository or next to this script.
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'sync'))
+from directory_sync import build_file_entry_list, update_directory
 
 
 # ------------------------------------------------------------------------------
@@ -18,6 +22,11 @@ import filecmp
 SASS_PATH = Path('C:/msys64/home/Monthy/.gem/ruby/2.1.0/bin/sass')
 
 
+# ------------------------------------------------------------------------------
+# Files copied from the pelican output to production
+PUBLISH_FILE_TYPES = {'.html', '.css', '.xml'}
+
+
 # ------------------------------------------------------------------------------
 # Author information
 __author__ = "Maarten Tegelaers"
@@ -29,95 +38,8 @@ __status__ = "development"
 
 
 # ------------------------------------------------------------------------------
-def build_file_entry_list(root_path : str, file_type : str):
-    file_entries = []
-    file_dir = [root_path]
-    while file_dir:
-        for entry in os.scandir(file_dir.pop()):
-            if not entry.name.startswith('.') and entry.is_dir():
-                file_dir.append(entry.path)
-            elif ( not entry.name.startswith('.')
-                   and entry.name.endswith(file_type)
-                   and entry.is_file()):
-                file_entries.append(entry)
-    return file_entries
-
-
-def update_directory(path_src: Path, path_target: Path, file_type: str, verbose: bool):
-    if verbose:
-        print("  src:    " + str(path_src))
-        print("  target: " + str(path_target))
-        print("  Building file list src...", end='')
-
-    src = build_file_entry_list(str(path_src), file_type)
-    src.sort(key=(lambda x: x.path[(len(str(path_src)) +1):]))
-
-
-    if verbose:
-        print("[DONE]")
-        print("  Building file list target...", end='')
-
-    target = build_file_entry_list(str(path_target), file_type)
-    target.sort(key=(lambda x: x.path[(len(str(path_target)) +1):]))
-
-    if verbose:
-        print("[DONE]")
-        print("  Updating files:")
-
-    # plumbum operations
-    rm = local['rm']
-
-    while src and target:
-        if src[0].name == target[0].name:
-            if not filecmp.cmp(src[0].path, target[0].path):
-                if verbose:
-                    print("    Copying:  " + src[0].path)
-                copyfile(src[0].path, target[0].path)
-            else:
-                if verbose:
-                    print("    Skipping: " + src[0].path)
-
-            src = src[1:]
-            target = target[1:]
-        else:
-            if ( src[0].path[(len(str(path_src)) +1):] <
-                 target[0].path[(len(str(path_target)) +1):]):
-                entry_path = Path(src[0].path)
-                goal_path = path_target / entry_path.relative_to(path_src)
-
-                if verbose:
-                    print("    Copying:  " + str(entry_path))
-
-                if not (goal_path.parent.exists() and
-                        goal_path.parent.is_dir()):
-                    goal_path.parent.mkdir()
-
-                copyfile(str(entry_path), str(goal_path))
-                src = src[1:]
-            else:
-                if verbose:
-                    print("    Removing: " + target[0].path)
-                rm(target[0].path)
-                target = target[1:]
-
-    for entry in src:
-        entry_path = Path(entry.path)
-        goal_path = path_target / entry_path.relative_to(path_src)
-
-        if not (goal_path.parent.exists() and goal_path.parent.is_dir()):
-            goal_path.parent.mkdir()
-        if verbose:
-            print("    Copying: " + str(entry_path))
-        copyfile(str(entry_path), str(goal_path))
-
-    for entry in target:
-        if verbose:
-            print("    Removing: " + entry.path)
-        rm(entry.path)
-
-
 @task
-def compile_theme(ctx, name="rubber-octopus", verbose=False):
+def compile_theme(ctx, name="rubber-octopus", verbose=False, rescan=False):
     # Update templates
     if verbose:
         print("Updating templates")
@@ -128,7 +50,7 @@ def compile_theme(ctx, name="rubber-octopus", verbose=False):
     if not (template_path_target.exists() and template_path_target.is_dir()):
         template_path_target.mkdir(parents=True)
 
-    update_directory(template_path_src, template_path_target, '.html', verbose)
+    update_directory(template_path_src, template_path_target, '.html', verbose, rescan)
 
     # Update css
     if verbose:
@@ -140,7 +62,7 @@ def compile_theme(ctx, name="rubber-octopus", verbose=False):
     if not (css_path_target.exists() and css_path_target.is_dir()):
         css_path_target.mkdir(parents=True)
 
-    update_directory(css_path_src, css_path_target, '.html', verbose)
+    update_directory(css_path_src, css_path_target, '.html', verbose, rescan)
 
     # Compile scss
     if verbose:
@@ -167,14 +89,14 @@ def compile_theme(ctx, name="rubber-octopus", verbose=False):
 
 
 @task
-def update_content(ctx, verbose=False):
+def update_content(ctx, verbose=False, rescan=False):
     if verbose:
         print("Updating content")
 
     content_path_src = Path('.\\content\\')
     content_path_target = Path('.\\preview\\') / content_path_src
 
-    update_directory(content_path_src, content_path_target, '.md', verbose)
+    update_directory(content_path_src, content_path_target, '.md', verbose, rescan)
 
 
 @task
@@ -211,7 +133,7 @@ def preview_current(ctx, verbose=False):
 
 
 @task
-def compile_publish(ctx, verbose=False):
+def compile_publish(ctx, verbose=False, rescan=False):
     if verbose:
         print("Compiling site with publish")
     cwd = Path.cwd()
@@ -232,18 +154,8 @@ def compile_publish(ctx, verbose=False):
     path_src = cwd / Path('preview/output/')
     path_target = cwd / Path('production')
 
-    # Content
+    # Content, theme and feeds, in a single pass over both trees
     if verbose:
-        print("  html:")
-
-    update_directory(path_src, path_target, '.html', verbose)
+        print("  html, css and feeds:")
 
-    # Theme
-    if verbose:
-        print("  css:")
-    update_directory(path_src, path_target, '.css', verbose)
-
-    # Feeds
-    if verbose:
-        print("  feeds:")
-    update_directory(path_src, path_target, '.xml', verbose)
+    update_directory(path_src, path_target, PUBLISH_FILE_TYPES, verbose, rescan)
@@ -8,11 +8,14 @@ files.
 # Libraries
 from invoke import task
 from plumbum import local, FG
-from shutil import copyfile
 
-import os
+import sys
 from pathlib import Path
-import filecmp
+
+# directory_sync.py is shared by the tasks.py scripts, it is found either in the
+# sync folder of this repository or next to this script.
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'sync'))
+from directory_sync import build_file_entry_list, update_directory
 
 
 # ------------------------------------------------------------------------------
@@ -31,93 +34,6 @@ __status__ = "development"
 
 
 # ------------------------------------------------------------------------------
-def build_file_entry_list(root_path : str, file_type : str):
-    file_entries = []
-    file_dir = [root_path]
-    while file_dir:
-        for entry in os.scandir(file_dir.pop()):
-            if not entry.name.startswith('.') and entry.is_dir():
-                file_dir.append(entry.path)
-            elif ( not entry.name.startswith('.')
-                   and entry.name.endswith(file_type)
-                   and entry.is_file()):
-                file_entries.append(entry)
-    return file_entries
-
-
-def update_directory(path_src: Path, path_target: Path, file_type: str, verbose: bool):
-    if verbose:
-        print("  src:    " + str(path_src))
-        print("  target: " + str(path_target))
-        print("  Building file list src...", end='')
-
-    src = build_file_entry_list(str(path_src), file_type)
-    src.sort(key=(lambda x: x.path[(len(str(path_src)) +1):]))
-
-
-    if verbose:
-        print("[DONE]")
-        print("  Building file list target...", end='')
-
-    target = build_file_entry_list(str(path_target), file_type)
-    target.sort(key=(lambda x: x.path[(len(str(path_target)) +1):]))
-
-    if verbose:
-        print("[DONE]")
-        print("  Updating files:")
-
-    # plumbum operations
-    rm = local['rm']
-
-    while src and target:
-        if src[0].name == target[0].name:
-            if not filecmp.cmp(src[0].path, target[0].path):
-                if verbose:
-                    print("    Copying:  " + src[0].path)
-                copyfile(src[0].path, target[0].path)
-            else:
-                if verbose:
-                    print("    Skipping: " + src[0].path)
-
-            src = src[1:]
-            target = target[1:]
-        else:
-            if ( src[0].path[(len(str(path_src)) +1):] <
-                 target[0].path[(len(str(path_target)) +1):]):
-                entry_path = Path(src[0].path)
-                goal_path = path_target / entry_path.relative_to(path_src)
-
-                if verbose:
-                    print("    Copying:  " + str(entry_path))
-
-                if not (goal_path.parent.exists() and
-                        goal_path.parent.is_dir()):
-                    goal_path.parent.mkdir()
-
-                copyfile(str(entry_path), str(goal_path))
-                src = src[1:]
-            else:
-                if verbose:
-                    print("    Removing: " + target[0].path)
-                rm(target[0].path)
-                target = target[1:]
-
-    for entry in src:
-        entry_path = Path(entry.path)
-        goal_path = path_target / entry_path.relative_to(path_src)
-
-        if not (goal_path.parent.exists() and goal_path.parent.is_dir()):
-            goal_path.parent.mkdir()
-        if verbose:
-            print("    Copying: " + str(entry_path))
-        copyfile(str(entry_path), str(goal_path))
-
-    for entry in target:
-        if verbose:
-            print("    Removing: " + entry.path)
-        rm(entry.path)
-
-
 def compile_elm(source_path : Path, target_path : Path, verbose : bool):
     pass
 
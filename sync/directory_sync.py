@@ -0,0 +1,662 @@
+"""
+Synchronise the files of a source directory tree to a target directory tree,
+shared by the invoke tasks.py scripts.
+
+Both trees are listed as sorted streams of relative paths, which are merged in
+a single linear pass into a SyncPlan of files to copy, update and delete. The
+plan is only executed afterwards.
+
+Every target tree keeps a SyncManifest of the files synchronised to it, such
+that later synchronisations only need to stat the source tree, and only read
+files of which the size or modification time changed.
+
+Files are copied by a pool of threads, within the kernel where the platform
+allows it.
+"""
+
+# ------------------------------------------------------------------------------
+# Libraries
+from shutil import copyfileobj, copymode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fnmatch import fnmatch
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on windows, files are never reflinked.
+    fcntl = None
+
+
+# ------------------------------------------------------------------------------
+# Author information
+__author__ = "Maarten Tegelaers"
+__copyright__ = "Copyright 2018, Maarten Tegelaers"
+
+__license__ = "All Rights Reserved"
+__version__ = "0.1"
+__status__ = "development"
+
+
+# ------------------------------------------------------------------------------
+# File lists
+def get_file_types(file_types) -> tuple:
+    '''
+    Get the file types as a sorted tuple.
+
+    :param file_types: A single suffix, e.g. '.html', or a collection of
+                       suffixes and glob patterns, e.g. {'.html', 'feed*.xml'}.
+    '''
+    if isinstance(file_types, str):
+        return (file_types,)
+    return tuple(sorted(file_types))
+
+
+def match_file_type(name : str, file_types : tuple):
+    '''
+    Get the first of file_types which matches the file name. A file type
+    containing any of '*?[' is matched as glob pattern, otherwise as suffix.
+
+    :returns: The matching file type, or None.
+    '''
+    for file_type in file_types:
+        if any(c in file_type for c in '*?['):
+            if fnmatch(name, file_type):
+                return file_type
+        elif name.endswith(file_type):
+            return file_type
+    return None
+
+
+def build_file_entry_buckets(root_path : str, file_types) -> dict:
+    '''
+    Get the DirEntries of all files within root_path, including its sub
+    directories, of the specified file types, bucketed by file type in a
+    single walk over the tree. Hidden files and directories are skipped.
+
+    :param root_path: The root directory to scan.
+    :param file_types: The file types to list, see get_file_types.
+
+    :returns: A dict of every file type to the list of the DirEntries of its
+              files, in no particular order.
+    '''
+    file_types = get_file_types(file_types)
+    buckets = dict((file_type, []) for file_type in file_types)
+    file_dir = [root_path]
+    while file_dir:
+        for entry in os.scandir(file_dir.pop()):
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                file_dir.append(entry.path)
+                continue
+
+            file_type = match_file_type(entry.name, file_types)
+            if file_type is not None and entry.is_file():
+                buckets[file_type].append(entry)
+    return buckets
+
+
+def build_file_entry_list(root_path : str, file_types):
+    '''
+    Get the DirEntries of all files within root_path, including its sub
+    directories, of the specified file types. Hidden files and directories
+    are skipped.
+
+    :param root_path: The root directory to scan.
+    :param file_types: The file types to list, see get_file_types.
+
+    :returns: A list of the DirEntries of the files, in no particular order.
+    '''
+    buckets = build_file_entry_buckets(root_path, file_types)
+    return [entry for entries in buckets.values() for entry in entries]
+
+
+def iter_relative_paths(root_path : Path, file_types):
+    '''
+    Iterate over the files within root_path, sorted by their path relative to
+    root_path, such that the files of two trees can be merged.
+
+    :param root_path: The root directory to scan.
+    :param file_types: The file types to list, see get_file_types.
+
+    :returns: An iterator over (relative path, DirEntry), where the relative
+              path uses '/' as separator. A missing root_path is treated as
+              an empty tree.
+    '''
+    if not Path(root_path).is_dir():
+        return iter(())
+
+    prefix_length = len(os.path.join(str(root_path), ''))
+    entries = [(entry.path[prefix_length:].replace(os.sep, '/'), entry)
+               for entry in build_file_entry_list(str(root_path), file_types)]
+    entries.sort(key=(lambda x: x[0]))
+    return iter(entries)
+
+
+# ------------------------------------------------------------------------------
+# Manifest
+MANIFEST_FILE = '.sync_manifest.json'
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def get_content_hash(path : str) -> str:
+    '''
+    Get the hex digest of the content of the file at path.
+    '''
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_stat(entry) -> list:
+    '''
+    Get the [size, modification time in ns] of the specified DirEntry.
+    '''
+    stat = entry.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class SyncManifest(object):
+    '''
+    The SyncManifest records for every file synchronised to a target tree the
+    size and modification time of its source, and the hash of its content if
+    known. It is stored as a hidden json file in the root of the target tree.
+
+    The manifest is only complete for the file types of which a
+    synchronisation finished, other file types need to be scanned.
+    '''
+    def __init__(self, path_target : Path):
+        '''
+        Construct the SyncManifest of path_target, loading its existing
+        entries if any.
+
+        :param path_target: The root of the target tree.
+        '''
+        self._path = Path(path_target) / MANIFEST_FILE
+        self._entries = {}
+        self._file_types = set()
+
+        if self._path.is_file():
+            try:
+                with self._path.open('r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._entries = data['entries']
+                self._file_types = set(data['file_types'])
+            except (ValueError, KeyError):
+                # a corrupt manifest only costs a rescan
+                self._entries = {}
+                self._file_types = set()
+
+    @property
+    def path(self) -> Path:
+        ''' The path of the json file holding the manifest entries. '''
+        return self._path
+
+    def is_complete(self, file_types) -> bool:
+        ''' Whether the manifest lists all target files of file_types. '''
+        return all(file_type in self._file_types
+                   for file_type in get_file_types(file_types))
+
+    def set_complete(self, file_types):
+        ''' Record that the manifest lists all target files of file_types. '''
+        self._file_types.update(get_file_types(file_types))
+
+    def get(self, relative_path : str):
+        '''
+        Get the [size, mtime, hash] entry of relative_path, or None.
+        '''
+        return self._entries.get(relative_path)
+
+    def update(self, relative_path : str, entry : list):
+        ''' Record the [size, mtime, hash] entry of relative_path. '''
+        self._entries[relative_path] = entry
+
+    def remove(self, relative_path : str):
+        ''' Remove relative_path from the manifest. '''
+        self._entries.pop(relative_path, None)
+
+    def iter_relative_paths(self, file_types):
+        '''
+        Iterate over the recorded files of file_types, like
+        iter_relative_paths iterates over the files of a tree.
+
+        :returns: An iterator over (relative path, entry), sorted by the
+                  relative path.
+        '''
+        file_types = get_file_types(file_types)
+        return iter(sorted((relative_path, entry)
+                           for relative_path, entry in self._entries.items()
+                           if match_file_type(relative_path.rpartition('/')[2], file_types) is not None))
+
+    def save(self):
+        ''' Write the manifest entries to the json file. '''
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with self._path.open('w', encoding='utf-8') as f:
+            json.dump({'file_types': sorted(self._file_types),
+                       'entries': self._entries},
+                      f, indent=1, sort_keys=True)
+
+
+# ------------------------------------------------------------------------------
+# Plan
+class SyncPlan(object):
+    '''
+    The SyncPlan describes the changes required to make the target tree equal
+    to the source tree, as lists of relative paths.
+    '''
+    def __init__(self, path_src : Path, path_target : Path):
+        '''
+        Construct a new empty SyncPlan.
+
+        :param path_src: The root of the source tree.
+        :param path_target: The root of the target tree.
+        '''
+        self._path_src = path_src
+        self._path_target = path_target
+
+        self.copies = []    # only in the source tree
+        self.updates = []   # in both trees, with different content
+        self.deletions = [] # only in the target tree
+        self.skipped = []   # in both trees, with the same content
+        self.pruned = []    # directories of the target tree removed once empty
+
+        # the manifest entries of the source files after synchronisation
+        self.entries = {}
+
+    @property
+    def path_src(self) -> Path:
+        ''' The root of the source tree. '''
+        return self._path_src
+
+    @property
+    def path_target(self) -> Path:
+        ''' The root of the target tree. '''
+        return self._path_target
+
+    @property
+    def is_empty(self) -> bool:
+        ''' Whether the target tree is already up to date. '''
+        return not (self.copies or self.updates or self.deletions)
+
+    def src_of(self, relative_path : str) -> Path:
+        ''' Get the path of relative_path within the source tree. '''
+        return self._path_src / relative_path
+
+    def target_of(self, relative_path : str) -> Path:
+        ''' Get the path of relative_path within the target tree. '''
+        return self._path_target / relative_path
+
+
+def _is_unchanged_in_manifest(src_entry, manifest_entry : list, entry : list,
+                              target_path : Path) -> bool:
+    '''
+    Compare a source file with the manifest entry of its target. The source
+    file is only read if its size or modification time changed, in which case
+    its hash is stored in entry. If the manifest entry has no hash, the
+    target file is read as well.
+
+    :param src_entry: The DirEntry of the source file.
+    :param manifest_entry: The [size, mtime, hash] in the manifest.
+    :param entry: The [size, mtime, hash] of the source file.
+    :param target_path: The Path of the target file.
+    '''
+    if manifest_entry[:2] == entry[:2]:
+        entry[2] = manifest_entry[2]
+        return True
+    if manifest_entry[2] is None:
+        try:
+            if os.stat(str(target_path)).st_size != entry[0]:
+                return False
+        except FileNotFoundError:
+            return False # removed by hand
+        entry[2] = get_content_hash(src_entry.path)
+        return entry[2] == get_content_hash(str(target_path))
+    entry[2] = get_content_hash(src_entry.path)
+    return entry[2] == manifest_entry[2]
+
+
+def _is_unchanged_in_target(src_entry, target_entry, entry : list) -> bool:
+    '''
+    Compare the content of a source file with its target file, storing the
+    hash of the source file in entry if it was read.
+
+    :param src_entry: The DirEntry of the source file.
+    :param target_entry: The DirEntry of the target file.
+    :param entry: The [size, mtime, hash] of the source file.
+    '''
+    if target_entry.stat().st_size != entry[0]:
+        return False
+    entry[2] = get_content_hash(src_entry.path)
+    return entry[2] == get_content_hash(target_entry.path)
+
+
+def plan_sync(path_src : Path, path_target : Path, file_types,
+              manifest : SyncManifest = None) -> SyncPlan:
+    '''
+    Plan the synchronisation of the files of file_types from path_src to
+    path_target, by merging the sorted relative paths of both trees in a
+    single pass. Each tree is walked at most once, regardless of the number
+    of file types.
+
+    If a manifest which is complete for file_types is specified, the target
+    tree is not scanned but taken from the manifest, and a source file is only
+    read when its size or modification time differ from the manifest.
+
+    :param path_src: The root of the source tree.
+    :param path_target: The root of the target tree.
+    :param file_types: The file types to synchronise, see get_file_types.
+    :param manifest: The optional SyncManifest of path_target.
+
+    :returns: The SyncPlan.
+    '''
+    plan = SyncPlan(path_src, path_target)
+
+    src = iter_relative_paths(path_src, file_types)
+    use_manifest = manifest is not None and manifest.is_complete(file_types)
+    if use_manifest:
+        target = manifest.iter_relative_paths(file_types)
+    else:
+        target = iter_relative_paths(path_target, file_types)
+    src_item = next(src, None)
+    target_item = next(target, None)
+
+    while src_item is not None or target_item is not None:
+        if target_item is None or (src_item is not None and
+                                   src_item[0] < target_item[0]):
+            plan.copies.append(src_item[0])
+            plan.entries[src_item[0]] = get_stat(src_item[1]) + [None]
+            src_item = next(src, None)
+        elif src_item is None or target_item[0] < src_item[0]:
+            plan.deletions.append(target_item[0])
+            target_item = next(target, None)
+        else:
+            entry = get_stat(src_item[1]) + [None]
+            if use_manifest:
+                is_unchanged = _is_unchanged_in_manifest(src_item[1], target_item[1], entry,
+                                                         plan.target_of(src_item[0]))
+            else:
+                is_unchanged = _is_unchanged_in_target(src_item[1], target_item[1], entry)
+            if is_unchanged:
+                plan.skipped.append(src_item[0])
+            else:
+                plan.updates.append(src_item[0])
+            plan.entries[src_item[0]] = entry
+            src_item = next(src, None)
+            target_item = next(target, None)
+
+    return plan
+
+
+# ------------------------------------------------------------------------------
+# Copy
+COPY_WORKERS = 8
+COPY_CHUNK_SIZE = 1 << 30
+
+# ioctl request to share the extents of a file, on btrfs, xfs and others
+FICLONE = 0x40049409
+
+
+def _reflink(src_fd : int, dst_fd : int) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        return False
+
+
+def _kernel_copy(src_fd : int, dst_fd : int, size : int) -> bool:
+    '''
+    Copy size bytes from src_fd to dst_fd within the kernel, with
+    copy_file_range or sendfile.
+
+    :returns: Whether the copy succeeded, if not nothing was written.
+    :raises OSError: If the copy stopped after part of the data was written.
+    '''
+    if hasattr(os, 'copy_file_range'):
+        copy = lambda offset: os.copy_file_range(src_fd, dst_fd, min(size - offset, COPY_CHUNK_SIZE))
+    elif hasattr(os, 'sendfile'):
+        copy = lambda offset: os.sendfile(dst_fd, src_fd, offset, min(size - offset, COPY_CHUNK_SIZE))
+    else:
+        return False
+
+    offset = 0
+    try:
+        while offset < size:
+            copied = copy(offset)
+            if copied == 0:
+                break
+            offset += copied
+    except OSError:
+        if offset == 0:
+            return False
+        raise
+    if offset == 0 and size > 0:
+        return False # e.g. not supported by the file system, fall back
+    if offset < size:
+        raise OSError("Copied only {} of {} bytes".format(offset, size))
+    return True
+
+
+def copy_file(src : str, dst : str, link : bool = False) -> str:
+    '''
+    Copy the file src to dst, replacing dst if it exists. The cheapest method
+    the platform and file system allow is used: a hard link if requested, a
+    reflink sharing the data of src, a copy within the kernel, or else
+    shutil.copyfile.
+
+    Copies are written to a hidden temporary file next to dst, which then
+    replaces dst. An existing dst is never written in place, as it may be a
+    hard link to src from an earlier synchronisation with link.
+
+    :param src: The path of the source file.
+    :param dst: The path of the target file.
+    :param link: Whether dst may be a hard link to src. Changes written to
+                 either file in place then show up in both.
+
+    :returns: The method used, 'link', 'reflink', 'kernel' or 'copy'.
+    '''
+    if link:
+        try:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            os.link(src, dst)
+            return 'link'
+        except OSError:
+            pass # e.g. across devices
+
+    directory, name = os.path.split(dst)
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.' + name, suffix='.tmp')
+    try:
+        with open(src, 'rb') as f_src, os.fdopen(fd, 'wb') as f_dst:
+            if _reflink(f_src.fileno(), f_dst.fileno()):
+                method = 'reflink'
+            elif _kernel_copy(f_src.fileno(), f_dst.fileno(), os.fstat(f_src.fileno()).st_size):
+                method = 'kernel'
+            else:
+                copyfileobj(f_src, f_dst)
+                method = 'copy'
+        # temporary files are only accessible by their owner
+        copymode(src, temporary)
+        os.replace(temporary, dst)
+    except BaseException:
+        if os.path.lexists(temporary):
+            os.remove(temporary)
+        raise
+    return method
+
+
+# ------------------------------------------------------------------------------
+# Delete
+def delete_files(paths) -> set:
+    '''
+    Delete the specified files in process. Files which no longer exist are
+    skipped, as the manifest may list files which were removed by hand.
+
+    :param paths: The Paths of the files to delete.
+
+    :returns: The set of the parent directories of the deleted files.
+    '''
+    parents = set()
+    for path in paths:
+        try:
+            os.remove(str(path))
+        except FileNotFoundError:
+            pass
+        parents.add(path.parent)
+    return parents
+
+
+def prune_empty_directories(root_path : Path, directories) -> list:
+    '''
+    Remove the specified directories and their ancestors below root_path, as
+    far as they are empty, deepest first.
+
+    :param root_path: The root of the tree, which is never removed.
+    :param directories: The Paths of the directories to prune.
+
+    :returns: The removed directories, relative to root_path with '/' as
+              separator.
+    '''
+    root_path = Path(root_path)
+    candidates = set()
+    for directory in directories:
+        while directory != root_path and root_path in directory.parents:
+            candidates.add(directory)
+            directory = directory.parent
+
+    pruned = []
+    for directory in sorted(candidates, key=(lambda x: len(x.parts)), reverse=True):
+        try:
+            directory.rmdir()
+        except OSError:
+            continue # not empty
+        pruned.append(directory.relative_to(root_path).as_posix())
+    return pruned
+
+
+# ------------------------------------------------------------------------------
+# Execute
+def _copy_entry(src : str, dst : str, link : bool, entry : list) -> str:
+    '''
+    Copy src to dst with copy_file and store the hash of the copied content in
+    the [size, mtime, hash] entry if it is not known yet, such that a source
+    file rewritten with the same content is not copied again.
+
+    :returns: The method used, see copy_file.
+    '''
+    method = copy_file(src, dst, link)
+    if entry[2] is None:
+        entry[2] = get_content_hash(dst)
+    return method
+
+
+def execute_sync(plan : SyncPlan, verbose : bool, manifest : SyncManifest = None,
+                 workers : int = COPY_WORKERS, link : bool = False):
+    '''
+    Execute the specified plan, copying new and changed files to the target
+    tree and removing the files that no longer exist in the source tree. The
+    directories left empty by the removal are pruned and recorded in the
+    pruned list of the plan.
+
+    :param plan: The SyncPlan to execute.
+    :param verbose: Whether to print every file operation.
+    :param manifest: The optional SyncManifest of the target tree, which is
+                     updated after every operation and saved afterwards, even
+                     if an operation fails.
+    :param workers: The number of threads copying files.
+    :param link: Whether target files may be hard links to the source files,
+                 see copy_file.
+    '''
+    try:
+        to_copy = plan.copies + plan.updates
+        for parent in set(plan.target_of(relative_path).parent for relative_path in to_copy):
+            parent.mkdir(parents=True, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = {}
+            for relative_path in to_copy:
+                if verbose:
+                    print("    Copying:  " + str(plan.src_of(relative_path)))
+                future = executor.submit(_copy_entry,
+                                         str(plan.src_of(relative_path)),
+                                         str(plan.target_of(relative_path)),
+                                         link,
+                                         plan.entries[relative_path])
+                futures[future] = relative_path
+
+            for future in as_completed(futures):
+                future.result()
+                if manifest is not None:
+                    manifest.update(futures[future], plan.entries[futures[future]])
+
+        for relative_path in plan.skipped:
+            if verbose:
+                print("    Skipping: " + str(plan.src_of(relative_path)))
+            if manifest is not None:
+                manifest.update(relative_path, plan.entries[relative_path])
+
+        if verbose:
+            for relative_path in plan.deletions:
+                print("    Removing: " + str(plan.target_of(relative_path)))
+        parents = delete_files(plan.target_of(relative_path) for relative_path in plan.deletions)
+        if manifest is not None:
+            for relative_path in plan.deletions:
+                manifest.remove(relative_path)
+
+        plan.pruned = prune_empty_directories(plan.path_target, parents)
+        if verbose:
+            for relative_path in plan.pruned:
+                print("    Pruning:  " + str(plan.target_of(relative_path)))
+    finally:
+        if manifest is not None:
+            manifest.save()
+
+
+def update_directory(path_src: Path, path_target: Path, file_types, verbose: bool,
+                     rescan: bool = False, workers: int = COPY_WORKERS, link: bool = False) -> SyncPlan:
+    '''
+    Synchronise the files of file_types from path_src to path_target.
+
+    The target tree is only scanned and compared by content the first time,
+    later synchronisations trust the SyncManifest stored in path_target.
+
+    :param path_src: The root of the source tree.
+    :param path_target: The root of the target tree.
+    :param file_types: The file types to synchronise, see get_file_types.
+    :param verbose: Whether to print the progress.
+    :param rescan: Whether to scan and compare the target tree regardless of
+                   the manifest, e.g. after it was changed by hand.
+    :param workers: The number of threads copying files.
+    :param link: Whether target files may be hard links to the source files,
+                 see copy_file.
+
+    :returns: The executed SyncPlan.
+    '''
+    if verbose:
+        print("  src:    " + str(path_src))
+        print("  target: " + str(path_target))
+        print("  Planning update...", end='')
+
+    manifest = SyncManifest(path_target)
+    plan = plan_sync(path_src, path_target, file_types, None if rescan else manifest)
+
+    if verbose:
+        print("[DONE]")
+        print("  Updating files: {} new, {} changed, {} removed, {} unchanged".format(
+            len(plan.copies), len(plan.updates), len(plan.deletions), len(plan.skipped)))
+
+    execute_sync(plan, verbose, manifest, workers, link)
+    manifest.set_complete(file_types)
+    manifest.save()
+    return plan
@@ -0,0 +1,72 @@
+"""
+Tests of directory_sync.py, run with python -m unittest from the sync folder.
+"""
+
+# ------------------------------------------------------------------------------
+# Libraries
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from directory_sync import update_directory
+
+
+# ------------------------------------------------------------------------------
+class TestUpdateDirectory(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        root = Path(self._directory.name)
+        self.path_src = root / 'src'
+        self.path_target = root / 'target'
+        (self.path_src / 'posts').mkdir(parents=True)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_copy_after_link_keeps_source(self):
+        src = self.path_src / 'posts' / 'a.html'
+        target = self.path_target / 'posts' / 'a.html'
+        src.write_text('first')
+
+        update_directory(self.path_src, self.path_target, '.html', False, rescan=True, link=True)
+        self.assertEqual(os.stat(str(src)).st_ino, os.stat(str(target)).st_ino)
+
+        # edited in place, which shows up in the linked target as well
+        src.write_text('second version')
+        update_directory(self.path_src, self.path_target, '.html', False)
+
+        self.assertEqual(src.read_text(), 'second version')
+        self.assertEqual(target.read_text(), 'second version')
+        self.assertNotEqual(os.stat(str(src)).st_ino, os.stat(str(target)).st_ino)
+
+    def test_copy_replaces_target(self):
+        src = self.path_src / 'posts' / 'a.html'
+        target = self.path_target / 'posts' / 'a.html'
+        src.write_text('first')
+        update_directory(self.path_src, self.path_target, '.html', False)
+
+        src.write_text('second version')
+        plan = update_directory(self.path_src, self.path_target, '.html', False)
+
+        self.assertEqual(plan.updates, ['posts/a.html'])
+        self.assertEqual(target.read_text(), 'second version')
+        self.assertEqual(sorted(os.listdir(str(target.parent))), ['a.html'])
+
+    def test_rewrite_same_content_is_skipped(self):
+        src = self.path_src / 'posts' / 'a.html'
+        src.write_text('first')
+        update_directory(self.path_src, self.path_target, '.html', False)
+
+        # rewritten with the same content, which only changes its mtime
+        src.write_text('first')
+        stat = os.stat(str(src))
+        os.utime(str(src), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        plan = update_directory(self.path_src, self.path_target, '.html', False)
+
+        self.assertEqual(plan.updates, [])
+        self.assertEqual(plan.skipped, ['posts/a.html'])
+
+
+if __name__ == '__main__':
+    unittest.main()